@@ -0,0 +1,113 @@
+import os
+import json
+# NumPy is imported by the functions that use it
+
+# Files of a capture directory. Each cycle is a compressed archive with the pending requests,
+# request j has the data items offsets[j]:offsets[j + 1] of the indices, sizes and submitted arrays
+CYCLE_FILE = "cycle_{:06d}.npz"
+METADATA_FILE = "capture.json"
+
+
+# Writes the inputs and the result of each scheduling cycle to a directory
+# so the cycles can be replayed offline without clients, threads and sleeps
+class CycleCapture:
+  def __init__(self, path, settings):
+    os.makedirs(path, exist_ok=True)
+
+    self.path = path
+    self.settings = settings
+    self.cycles = 0
+
+    self.__write_metadata()
+
+
+  # Save the pending requests, the time and delta of a cycle and the data items the scheduler returned
+  def add(self, pending, current_time, delta, schedule):
+    import numpy as np
+
+    offsets = [0]
+    indices = []
+    sizes = []
+    submitted = []
+    for request in pending:
+      for data_item in request.get_outstanding():
+        indices.append(data_item.get_index())
+        sizes.append(data_item.get_size())
+        submitted.append(data_item.get_submitted_time())
+      offsets.append(len(indices))
+
+    np.savez_compressed(os.path.join(self.path, CYCLE_FILE.format(self.cycles)),
+      current_time=np.float64(current_time),
+      delta=np.float64(delta),
+      request_times=np.array([request.submitted_request_time for request in pending], dtype=np.float64),
+      offsets=np.array(offsets, dtype=np.int64),
+      indices=np.array(indices, dtype=np.int64),
+      sizes=np.array(sizes, dtype=np.int64),
+      submitted=np.array(submitted, dtype=np.float64),
+      schedule=np.array([data_item.get_index() for data_item in schedule], dtype=np.int64))
+
+    self.cycles += 1
+
+
+  # Write the number of captured cycles
+  def close(self):
+    self.__write_metadata()
+
+
+  def __write_metadata(self):
+    with open(os.path.join(self.path, METADATA_FILE), 'w') as metadata:
+      json.dump(dict(self.settings, cycles=self.cycles), metadata, indent=2)
+
+
+# Pending request of a captured cycle, provides what the schedulers read from a client
+class CapturedRequest:
+  def __init__(self, submitted_request_time, data_items):
+    self.submitted_request_time = submitted_request_time
+    self.request = data_items
+    self.outstanding = {data_item.get_index(): data_item for data_item in data_items}
+
+
+  # Return the data item of the given index or None if it is not needed
+  def get_indexed_data_item(self, index):
+    return self.outstanding.get(index)
+
+
+  # Return the data items that are not received yet
+  def get_outstanding(self):
+    return self.outstanding.values()
+
+
+# Read the settings of a capture directory
+def load_metadata(path):
+  with open(os.path.join(path, METADATA_FILE)) as metadata:
+    return json.load(metadata)
+
+
+# Read a captured cycle. Returns the pending requests, the time, delta
+# and the indices of the data items the scheduler returned during the capture
+def load_cycle(path, cycle):
+  import numpy as np
+  from utilities import DataItems
+
+  with np.load(os.path.join(path, CYCLE_FILE.format(cycle))) as archive:
+    offsets = archive["offsets"]
+    indices = archive["indices"]
+    sizes = archive["sizes"]
+    submitted = archive["submitted"]
+
+    pending = []
+    for request_index, request_time in enumerate(archive["request_times"]):
+      data_items = []
+      for position in range(offsets[request_index], offsets[request_index + 1]):
+        # The probability is not used by the schedulers
+        data_item = DataItems.DataItem(int(indices[position]), int(sizes[position]), 0)
+        data_item.submitted_request_time = float(submitted[position])
+        data_items.append(data_item)
+
+      pending.append(CapturedRequest(float(request_time), data_items))
+
+    delta = float(archive["delta"])
+    if delta.is_integer():
+      delta = int(delta)
+
+    return pending, float(archive["current_time"]), delta, archive["schedule"].tolist()
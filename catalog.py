@@ -0,0 +1,92 @@
+import os
+import json
+import random
+import argparse
+from config import TOTAL_DATA_ITEMS, THETA, MIN_DATA_SIZE, MAX_DATA_SIZE, DATA_SEED
+# NumPy is imported by the functions that use it
+
+# Columns of a catalog directory, data item i has the values id[i], size[i] and probability[i].
+# The probabilities are in descending order and cumulative[i] is the sum of the probabilities 0..i
+ID_FILE = "id.npy"
+SIZE_FILE = "size.npy"
+PROBABILITY_FILE = "probability.npy"
+CUMULATIVE_FILE = "cumulative.npy"
+METADATA_FILE = "catalog.json"
+
+# Data items written at once
+CHUNK_SIZE = 1000000
+
+
+# Write a catalog with the same data items that DataItems generates for the same parameters.
+# Sizes are in bytes and the columns are written in chunks to keep memory usage bounded.
+# The Zipf weights are computed with Python floats like DataItems, so the probabilities are identical
+def write_catalog(path, item_count=TOTAL_DATA_ITEMS, theta=THETA, minimum_size=MIN_DATA_SIZE, maximum_size=MAX_DATA_SIZE, seed=DATA_SEED):
+  import numpy as np
+
+  os.makedirs(path, exist_ok=True)
+
+  ids = np.lib.format.open_memmap(os.path.join(path, ID_FILE), mode='w+', dtype=np.int64, shape=(item_count,))
+  sizes = np.lib.format.open_memmap(os.path.join(path, SIZE_FILE), mode='w+', dtype=np.int64, shape=(item_count,))
+  probabilities = np.lib.format.open_memmap(os.path.join(path, PROBABILITY_FILE), mode='w+', dtype=np.float64, shape=(item_count,))
+  cumulative = np.lib.format.open_memmap(os.path.join(path, CUMULATIVE_FILE), mode='w+', dtype=np.float64, shape=(item_count,))
+
+  # Zipf denominator, the weights are added in order like DataItems does
+  denominator = 0
+  for i in range(item_count):
+    denominator += (1 / (i + 1)) ** theta
+
+  # Same sequence of sizes as DataItems
+  generator = random.Random(seed)
+  accumulated = 0
+  for start in range(0, item_count, CHUNK_SIZE):
+    end = min(start + CHUNK_SIZE, item_count)
+
+    ids[start:end] = np.arange(start, end)
+    sizes[start:end] = [generator.randint(minimum_size * 1024, maximum_size * 1024) for _ in range(end - start)]
+    probabilities[start:end] = [(1 / (i + 1)) ** theta / denominator for i in range(start, end)]
+
+    # The sum continues from the previous chunk so the probabilities are added one by one like in Clients
+    cumulative[start:end] = np.cumsum(np.concatenate(([accumulated], probabilities[start:end])))[1:]
+    accumulated = cumulative[end - 1]
+
+  ids.flush()
+  sizes.flush()
+  probabilities.flush()
+  cumulative.flush()
+
+  with open(os.path.join(path, METADATA_FILE), 'w') as metadata:
+    json.dump({
+      "item_count": item_count,
+      "theta": theta,
+      "minimum_size": minimum_size,
+      "maximum_size": maximum_size,
+      "seed": seed,
+    }, metadata, indent=2)
+
+
+# Open the columns of a catalog as read-only memory maps
+def load_catalog(path):
+  import numpy as np
+
+  with open(os.path.join(path, METADATA_FILE)) as metadata:
+    metadata = json.load(metadata)
+
+  ids = np.load(os.path.join(path, ID_FILE), mmap_mode='r')
+  sizes = np.load(os.path.join(path, SIZE_FILE), mmap_mode='r')
+  probabilities = np.load(os.path.join(path, PROBABILITY_FILE), mmap_mode='r')
+  cumulative = np.load(os.path.join(path, CUMULATIVE_FILE), mmap_mode='r')
+
+  return metadata, ids, sizes, probabilities, cumulative
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Write a memory-mapped data item catalog")
+  parser.add_argument("path", help="Output directory")
+  parser.add_argument("--total-data-items", type=int, default=TOTAL_DATA_ITEMS)
+  parser.add_argument("--theta", type=float, default=THETA)
+  parser.add_argument("--min-data-size", type=int, default=MIN_DATA_SIZE)
+  parser.add_argument("--max-data-size", type=int, default=MAX_DATA_SIZE)
+  parser.add_argument("--seed", type=int, default=DATA_SEED)
+  arguments = parser.parse_args()
+
+  write_catalog(arguments.path, arguments.total_data_items, arguments.theta, arguments.min_data_size, arguments.max_data_size, arguments.seed)
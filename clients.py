@@ -1,17 +1,28 @@
 import threading
+import queue
 import random
+import bisect
 from time import sleep
-from utilities import RequestStatus
+from utilities import RequestStatus, LRUCache
 import timeit
 import copy
 
 
 class Clients:
-  def __init__(self, client_count, data_items, DOWN_STREAM, minimum_data_items=1, maximum_data_items=4, seed=100, maximum_interval=2):
+  def __init__(self, client_count, data_items, DOWN_STREAM, minimum_data_items=1, maximum_data_items=4, seed=100, maximum_interval=2, long_running=False, maximum_in_flight=100, workload=None, request_rounds=1, cache_size=0, shard=None):
     # Client information 
     self.client_count = client_count
-    # Sort data items based on their selection probability 
-    self.data_items = sorted(data_items.get_data_items(), key = lambda data_item: data_item.get_probability(), reverse=True)
+    self.catalog = data_items
+
+    # Requests and arrivals are read from a generated workload instead of the Zipf's distribution
+    self.workload = workload
+    if workload is not None:
+      if workload.get_item_count() > data_items.item_count:
+        raise ValueError("Workload was generated for {} data items but only {} are available".format(workload.get_item_count(), data_items.item_count))
+      self.client_count = len(workload)
+
+    # Data item indices sorted based on their selection probability and their accumulated probabilities
+    self.selection_order, self.accumulated_probabilities = data_items.get_selection_table()
     
     # Seed to select a random data item based on its probability
     self.seed = seed
@@ -23,59 +34,126 @@ class Clients:
     # Interval to wait before sending a request
     self.maximum_interval = maximum_interval
 
+    # Requests that each client sends one after the other and the
+    # capacity of the cache of received data items, zero disables the cache
+    self.request_rounds = request_rounds
+    self.cache_size = cache_size
+
     self.clients = []
-    self.threads = []
+    self.threads = {} # Client id -> Thread
+
+    # Long-running mode creates clients while the simulation runs, with at most maximum_in_flight
+    # unfinished clients. Finished clients are released and not kept in the clients list
+    self.long_running = long_running
+    self.in_flight = threading.Semaphore(maximum_in_flight)
+    self.downstream = DOWN_STREAM
+
+    # Generator used to select the data items of the requests
+    self.generator = random.Random(self.seed)
+
+    # Sharded mode is given (shard, shards) and only requests the data items with index % shards == shard.
+    # Every shard creates the same clients. The arrival of each request is drawn from a generator with a
+    # seed derived from the client seed, so the requests are sent at the same time in all shards
+    self.shard = shard
+    self.arrival_generator = random.Random("{}-arrivals".format(self.seed))
+
+    # Thread-safe queues where clients announce a sent request and a finished request.
+    # The server only consumes new events instead of scanning every client
+    self.arrivals = queue.Queue()
+    self.completions = queue.Queue()
 
     # Use at the MTRS optimization problem
     self.maximum_data_item_index = 0
 
-    self.__init_clients(DOWN_STREAM)
+    if not self.long_running:
+      self.__init_clients()
   
 
   # Initialize a list of clients based on the Zipf's distribution
-  def __init_clients(self, DOWN_STREAM):
-    # Seed to select pseudo-random data items
+  def __init_clients(self):
+    # Seed for the interval that each client waits before sending its request
     random.seed(self.seed)
 
+    # For each client
+    for client_index in range(self.client_count):
+      self.clients.append(self.__create_client(client_index))
+
+
+  # Create a client with a request based on the Zipf's distribution
+  def __create_client(self, client_index):
+    if self.workload is not None:
+      return self.__create_workload_client(client_index)
+
+    requests = [self.__create_request() for _ in range(self.request_rounds)]
+
+    arrival = None
+    round_arrivals = None
+    if self.shard is not None:
+      requests = [self.__shard_request(request) for request in requests]
+
+      # Each following request is sent a random interval after the previous one
+      arrival = self.arrival_generator.randint(0, self.maximum_interval)
+      round_arrivals = []
+      for _ in requests[1:]:
+        round_arrivals.append((round_arrivals[-1] if round_arrivals else arrival) + self.arrival_generator.randint(0, self.maximum_interval))
+
+    # Create Client with requests
+    return self.Client(client_index, requests[0], self.downstream, self.maximum_interval, self.arrivals, self.completions, arrival, requests[1:], self.cache_size, round_arrivals)
+
+
+  # Keep the data items of a request that belong to the shard
+  def __shard_request(self, request):
+    shard, shards = self.shard
+    return [data_item for data_item in request if data_item.get_index() % shards == shard]
+
+
+  # Create a request based on the Zipf's distribution
+  def __create_request(self):
     # Source on how to select data items based on probabilities: 
     # https://stackoverflow.com/questions/33888612/how-to-make-selection-random-based-on-percentage
     
-    # For each client
-    for client_index in range(self.client_count):
-      request = []
-
-      # For a random number of data items
-      for _ in range(random.randint(self.minimum_data_items, self.maximum_data_items)):
-        # Probability used to select an item from the items list
-        item_index_probability = random.uniform(0, 1)
-
-        # Variable to accumulate probabilities of data items
-        accumulated_probability = 0
-        
-        # For each item append to request based on its probability
-        for item in self.data_items:
-          # Calculate the next probability for the data item to be selected 
-          accumulated_probability += item.get_probability()
-
-          # Data item with the corresponding probability was found 
-          if item_index_probability < accumulated_probability:
-            data_item = copy.copy(item) # Create a shallow copy to set submission time
-            data_item.set_submitted_time()
-            request.append(data_item)
-
-
-            # Find the final item's index which is used by the 
-            # server to calculate the optimal solution on the MTRS 
-            if self.maximum_data_item_index < item.get_index():
-              self.maximum_data_item_index = item.get_index()
-
-            break
-      
-      # Create Client with requests
-      client = self.Client(client_index, request, DOWN_STREAM, self.maximum_interval)
-      self.clients.append(client)
+    request = []
+
+    # For a random number of data items
+    for _ in range(self.generator.randint(self.minimum_data_items, self.maximum_data_items)):
+      # Probability used to select an item from the items list
+      item_index_probability = self.generator.uniform(0, 1)
+
+      # First data item whose accumulated probability is higher than the selected one
+      position = bisect.bisect_right(self.accumulated_probabilities, item_index_probability)
+
+      # No data item was found due to rounding of the accumulated probabilities
+      if position == len(self.accumulated_probabilities):
+        continue
+
+      item = self.catalog.get_data_item(int(self.selection_order[position]))
+      data_item = copy.copy(item) # Create a shallow copy to set submission time when the request is sent
+      request.append(data_item)
+
+      # Find the final item's index which is used by the 
+      # server to calculate the optimal solution on the MTRS 
+      if self.maximum_data_item_index < item.get_index():
+        self.maximum_data_item_index = item.get_index()
+    
+    return request
 
   
+  # Create a client with the request and arrival of the workload
+  def __create_workload_client(self, client_index):
+    request = []
+    for index in self.workload.get_request(client_index):
+      data_item = copy.copy(self.catalog.get_data_item(int(index))) # Create a shallow copy to set submission time when the request is sent
+      request.append(data_item)
+
+      if self.maximum_data_item_index < data_item.get_index():
+        self.maximum_data_item_index = data_item.get_index()
+
+    if self.shard is not None:
+      request = self.__shard_request(request)
+
+    return self.Client(client_index, request, self.downstream, self.maximum_interval, self.arrivals, self.completions, self.workload.get_arrival(client_index))
+
+
   # Get final data item's position
   def max_data_item(self):
     return self.maximum_data_item_index
@@ -105,23 +183,76 @@ class Clients:
 
 
   def send_requests(self):  
+    # Arrivals of the workload are relative to this time
+    self.start_time = timeit.default_timer()
+
+    # Clients are created by a separate thread when a client finishes
+    if self.long_running:
+      threading.Thread(target=self.__spawn_clients).start()
+      return
+
     # Start a Thread for each client
     for client in self.clients:
-      thread = threading.Thread(target=client.send_request)
-      thread.start()
+      self.__start_client(client)
+
+
+  # Create and start clients, blocking while maximum_in_flight clients are unfinished
+  def __spawn_clients(self):
+    for client_index in range(self.client_count):
+      self.in_flight.acquire()
+      self.__start_client(self.__create_client(client_index))
+
 
-      # Append to the list of active threads
-      self.threads.append(thread)
+  # Start the thread of a client
+  def __start_client(self, client):
+    thread = threading.Thread(target=client.send_request, args=(self.start_time,))
+
+    # Add to the active threads before starting, the client may finish immediately
+    self.threads[client.get_id()] = thread
+    thread.start()
+
+
+  # Wait for the thread of a finished client and release it
+  def join_client(self, client):
+    self.threads.pop(client.get_id()).join()
+
+    # Allow the next client to be created
+    if self.long_running:
+      self.in_flight.release()
 
 
   # Inner class that is used to store client information  
   class Client:
-    def __init__(self, id, request, DOWN_STREAM, maximum_interval):
+    def __init__(self, id, request, DOWN_STREAM, maximum_interval, arrivals, completions, arrival=None, rounds=(), cache_size=0, round_arrivals=None):
       self.id = id
-      self.request = request
       self.submitted_request_time = -1
       self.downstream = DOWN_STREAM
-      self.latency = 0
+
+      # Position in the downstream up to which data items were already processed
+      self.downstream_position = 0
+
+      # Latency of each request round
+      self.latencies = []
+
+      # Requests sent after the current request is finished. With round_arrivals each of them is
+      # submitted at a fixed time after the start of the simulation, or as soon as the previous
+      # request is finished if that is later, otherwise after a random interval
+      self.rounds = list(rounds)
+      self.round_arrivals = None if round_arrivals is None else list(round_arrivals)
+
+      # Received data items are kept in the cache so the following
+      # requests only ask the server for the data items that are not cached
+      self.cache = LRUCache(cache_size) if cache_size else None
+
+      # Number of data items in all the requests
+      self.data_item_count = 0
+
+      # Current request and the data items of it that are not received yet, keyed by their index, 
+      # and their count. A data item requested more than once is received with a single broadcast
+      self.request = []
+      self.outstanding = {}
+      self.remaining = 0
+      self.__set_request(request)
 
       # The request was not sent yet. This helps us activate requests at
       # random intervals since all requests do not reach the server at the
@@ -132,45 +263,128 @@ class Clients:
       # This is used to avoid duplicate requests on the server side
       self.received = False
 
-      # Interval to wait before sending the request
+      # Interval to wait before sending the request, or the time
+      # after the start of the simulation that the request is sent
       self.maximum_interval = maximum_interval
+      self.arrival = arrival
 
       # Semaphore used to block when request is sent till the respose has arrived
       self.semaphore = threading.Semaphore(0)
 
+      # Semaphore used to notify the server that the broadcast data items were processed
+      self.acknowledge = threading.Semaphore(0)
+
+      # Queues shared with the server to report sent and finished requests
+      self.arrivals = arrivals
+      self.completions = completions
+
 
     # Send request to server and block till a
     # data item arrives. Update remaining data items and continue
-    def send_request(self):
+    def send_request(self, start_time=None):
       # Wait before sending the request
-      sleep(random.randint(0, self.maximum_interval))
+      if self.arrival is None:
+        sleep(random.randint(0, self.maximum_interval))
+      else:
+        sleep(max(0, start_time + self.arrival - timeit.default_timer()))
       
-      self.submitted_request_time = timeit.default_timer()
+      submitted_time = None
+      while True:
+        self.__send_current_request(submitted_time)
+
+        if not self.rounds:
+          break
+
+        # Wait before sending the next request
+        if self.round_arrivals is None:
+          sleep(random.randint(0, self.maximum_interval))
+        else:
+          submitted_time = start_time + self.round_arrivals.pop(0)
+          sleep(max(0, submitted_time - timeit.default_timer()))
+        self.__set_request(self.rounds.pop(0))
+
+      # Mark request as finished
+      self.status = RequestStatus.FINISHED
+
+
+    # Send the current request and block till all of its data items are received.
+    # The latency is measured from the submitted time when it is given
+    def __send_current_request(self, submitted_time=None):
+      self.submitted_request_time = timeit.default_timer() if submitted_time is None else submitted_time
+
+      # The schedulers rank data items by the time they were submitted
+      for item in self.request:
+        item.set_submitted_time()
       
       # Set the flag that the request was send
       self.status = RequestStatus.SENT
+
+      # All data items were found in the cache, the server only
+      # needs to know about it when the client sends no more requests
+      if not self.remaining:
+        self.latencies.append(timeit.default_timer() - self.submitted_request_time)
+        if not self.rounds:
+          self.arrivals.put(self)
+        return
+
+      # Notify the server about the new request
+      self.arrivals.put(self)
       
-      while self.request:
+      while self.remaining:
         # Block till a data item arrives
         self.semaphore.acquire()
 
-        # Server did not send anything
-        if not self.downstream:
-          continue        
-
-        for response in self.downstream[:]:
-          for request in self.request[:]: 
-            if request.get_id() != response.get_id():
-              continue
-            
-            # Request received and is not needed anymore
-            self.request.remove(request)
-            
+        self.__receive_data_items()
+
+        # Let the server continue with the next broadcast
+        self.acknowledge.release()
+
+
+    # Set the current request, data items found in the cache are not requested
+    def __set_request(self, request):
+      self.request = request
+      self.data_item_count += len(request)
+
+      self.outstanding = {}
+      checked = set()
+      for item in request:
+        if item.get_index() in checked:
+          continue
+        checked.add(item.get_index())
+
+        if self.cache is not None and self.cache.get(item.get_index()) is not None:
+          continue
+        self.outstanding[item.get_index()] = item
+      
+      self.remaining = len(self.outstanding)
+
+
+    # Keep the broadcast data items that are still needed, only the data items
+    # written after the last call are checked. The server is notified as soon
+    # as the last data item is received
+    def __receive_data_items(self):
+      for position in range(self.downstream_position, len(self.downstream)):
+        # Data item is not needed or it was already received
+        data_item = self.outstanding.pop(self.downstream[position].get_index(), None)
+        if data_item is None:
+          continue
+
+        self.remaining -= 1
+
+        if self.cache is not None:
+          self.cache.put(data_item.get_index(), data_item)
+
+      self.downstream_position = len(self.downstream)
+
+      if self.remaining:
+        return
+
       # Calculate AAL after the response was received and the request is finished
-      self.latency = timeit.default_timer() - self.submitted_request_time
+      latency = timeit.default_timer() - self.submitted_request_time
+      self.latencies.append(latency)
 
-      # Mark request as finished
-      self.status = RequestStatus.FINISHED
+      # Notify the server that the request is finished with its latency and whether the client sends more requests
+      self.completions.put((self, latency, not self.rounds))
               
 
      # String on how the object was created (for debuging)
@@ -193,17 +407,40 @@ class Clients:
       return self.request
 
 
-    # Returns latency to calculate AAL
+    # Returns latency to calculate AAL, the average of all the requests
     def get_latency(self):
-      return self.latency
+      if not self.latencies:
+        return 0
 
+      return sum(self.latencies) / len(self.latencies)
 
-    # Return client's request at position index
+
+    # Return the latency of each request
+    def get_latencies(self):
+      return self.latencies
+
+
+    # Return the number of data items in all the requests
+    def get_data_item_count(self):
+      return self.data_item_count
+
+
+    # Return the cache hits and misses of the requests
+    def get_cache_statistics(self):
+      if self.cache is None:
+        return 0, 0
+
+      return self.cache.hits, self.cache.misses
+
+
+    # Return client's outstanding data item with the given index
     def get_indexed_data_item(self, index):
-      for item in self.request:
-        if item.get_index() == index:
-          return item
-      return None
+      return self.outstanding.get(index)
+
+
+    # Return the data items that are not received yet
+    def get_outstanding(self):
+      return self.outstanding.values()
 
 
     # Return client's request status
@@ -1,4 +1,7 @@
+import os
 import random
+import argparse
+from dataclasses import dataclass, fields
 
 # Data Items
 TOTAL_DATA_ITEMS = 10
@@ -6,20 +9,136 @@ THETA = 0.8
 MIN_DATA_SIZE = 10 #KiB
 MAX_DATA_SIZE = 30 #KiB
 DATA_SEED = 100
+CATALOG = None # Directory of a catalog created by catalog.py, replaces the generated data items
 
 # Clients
 CLIENTS = 100
 MIN_DATA_ITEMS = 10
 MAX_DATA_ITEMS = 30
 CLIENT_SEED = 10
-CLIENT_SLEEP_INTERVAL = 1 
+CLIENT_SLEEP_INTERVAL = 1
+WORKLOAD = None # Directory of a workload created by workload.py, replaces the generated requests
+REQUEST_ROUNDS = 1 # Requests each client sends one after the other, a workload has a single request per client
+CLIENT_CACHE_SIZE = 0 # Data items each client keeps in its LRU cache, 0 disables the cache
 
 # Server
-TIME_SLOT = random.randint(1, 3)
+TIME_SLOT = None # Random value in [1, 3] when not set
 BANDWIDTH = 1024 #KiB/s
-DELTA = 4 # Must allow at least one full request to be downloaded 
+DELTA = 4 # Must allow at least one full request to be downloaded
+ADAPTIVE_DELTA = False # Adjust delta before each cycle from the pending requests, recent latency and scheduling time
+MIN_DELTA = 2 # Bounds of the adaptive delta
+MAX_DELTA = 16
+DELTA_STEP = 1 # Time slots delta changes by in a cycle
+SCHEDULER = "mtrs" # One of mtrs, rxw, lwf, mrf, fcfs
+MTRS_WORKERS = 1 # Processes that solve independent MTRS components, 1 solves them in the server process
+MTRS_PARALLEL_THRESHOLD = 50 # Minimum requests of a component to be solved in a worker process
+ONLINE_SCHEDULING = False # Re-plan the unsent data items when requests arrive during a broadcast
+REPLAN_INTERVAL = 1 # Minimum data items broadcast between two re-plans, the unsent data items are re-ranked after every data item
+CAPTURE = None # Directory where the scheduling cycles are captured for replay.py
+SHARDS = 1 # Server processes, each one serves the data items with index % SHARDS equal to its shard
+
+# Long-running mode
+LONG_RUNNING = False # Release finished clients and keep only a compact record of each request
+MAX_IN_FLIGHT = 100 # Maximum number of unfinished clients in long-running mode
+METRICS_FILE = None # CSV file where the records of the finished requests are written
 
 
 # Display options
 DEBUG = False
-BENCHMARK = False
\ No newline at end of file
+BENCHMARK = False
+
+# Prefix of the environment variables that override the defaults, e.g. MPC_CLIENTS=500
+ENVIRONMENT_PREFIX = "MPC_"
+
+
+# Configuration of a single run. The defaults are the values above and
+# can be overridden by environment variables and command line arguments
+@dataclass
+class Config:
+  # Data Items
+  total_data_items: int = TOTAL_DATA_ITEMS
+  theta: float = THETA
+  min_data_size: int = MIN_DATA_SIZE
+  max_data_size: int = MAX_DATA_SIZE
+  data_seed: int = DATA_SEED
+  catalog: str = CATALOG
+
+  # Clients
+  clients: int = CLIENTS
+  min_data_items: int = MIN_DATA_ITEMS
+  max_data_items: int = MAX_DATA_ITEMS
+  client_seed: int = CLIENT_SEED
+  client_sleep_interval: int = CLIENT_SLEEP_INTERVAL
+  workload: str = WORKLOAD
+  request_rounds: int = REQUEST_ROUNDS
+  client_cache_size: int = CLIENT_CACHE_SIZE
+
+  # Server
+  time_slot: int = TIME_SLOT
+  bandwidth: int = BANDWIDTH
+  delta: int = DELTA
+  adaptive_delta: bool = ADAPTIVE_DELTA
+  min_delta: int = MIN_DELTA
+  max_delta: int = MAX_DELTA
+  delta_step: int = DELTA_STEP
+  scheduler: str = SCHEDULER
+  mtrs_workers: int = MTRS_WORKERS
+  mtrs_parallel_threshold: int = MTRS_PARALLEL_THRESHOLD
+  online_scheduling: bool = ONLINE_SCHEDULING
+  replan_interval: int = REPLAN_INTERVAL
+  capture: str = CAPTURE
+  shards: int = SHARDS
+
+  # Long-running mode
+  long_running: bool = LONG_RUNNING
+  max_in_flight: int = MAX_IN_FLIGHT
+  metrics_file: str = METRICS_FILE
+
+  # Display options
+  debug: bool = DEBUG
+  benchmark: bool = BENCHMARK
+
+
+  def __post_init__(self):
+    # The time slot is selected for the run and not when the module is imported
+    if self.time_slot is None:
+      self.time_slot = random.randint(1, 3)
+
+
+  # Create the configuration from the environment and the command line arguments.
+  # Command line arguments have priority over the environment variables
+  @classmethod
+  def from_args(cls, argv=None, environment=os.environ):
+    parser = argparse.ArgumentParser(description="On-demand broadcast scheduling simulation")
+    for field in fields(cls):
+      parser.add_argument("--" + field.name.replace('_', '-'), dest=field.name, type=_converter(field.type), default=None)
+
+    arguments = vars(parser.parse_args(argv))
+
+    values = {}
+    for field in fields(cls):
+      variable = ENVIRONMENT_PREFIX + field.name.upper()
+      if arguments[field.name] is not None:
+        values[field.name] = arguments[field.name]
+      elif variable in environment:
+        values[field.name] = _converter(field.type)(environment[variable])
+
+    return cls(**values)
+
+
+# Return the function that converts a string to the type of a field
+def _converter(field_type):
+  if field_type is bool:
+    return _boolean
+
+  return field_type
+
+
+# Convert a string such as "true" or "0" to a boolean
+def _boolean(value):
+  if value.lower() in ("1", "true", "yes", "on"):
+    return True
+  if value.lower() in ("0", "false", "no", "off"):
+    return False
+
+  raise ValueError("Invalid boolean value: {}".format(value))
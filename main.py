@@ -1,42 +1,52 @@
-from distutils.command.config import config
 from clients import Clients
 from server import Server
 from utilities import DataItems
 import timeit
-import random
-from utilities import BenchmarkUtilities 
-from config import * 
-# # Data Items
-# TOTAL_DATA_ITEMS = 10
-# THETA = 0.8
-# MIN_DATA_SIZE = 10 #KiB
-# MAX_DATA_SIZE = 30 #KiB
-# DATA_SEED = 100
-
-# # Clients
-# CLIENTS = 100
-# MIN_DATA_ITEMS = 10
-# MAX_DATA_ITEMS = 30
-# CLIENT_SEED = 10
-# CLIENT_SLEEP_INTERVAL = 1 
-
-# # Server
-# TIME_SLOT = random.randint(1, 3)
-# BANDWIDTH = 24 #KiB/s
-# DELTA = 10 # Must allow at least one full request to be downloaded   
+from utilities import BenchmarkUtilities, CompletionRecords
+from config import Config
+from schedulers import create_scheduler, DeltaController
 
 DOWN_STREAM = []
 
-# Spawn data items, clients and a server
-def init():
+# Spawn data items, clients and a server. In sharded mode
+# shard is (shard, shards) and the server only serves the data items of the shard
+def init(config, shard=None):
   # Create a list of all available data items used for data selection based on their probabilities
-  data_items = DataItems(TOTAL_DATA_ITEMS, THETA, MIN_DATA_SIZE, MAX_DATA_SIZE, DATA_SEED)
+  data_items = DataItems(config.total_data_items, config.theta, config.min_data_size, config.max_data_size, config.data_seed, config.catalog)
+
+  # Requests can be read from a generated workload file
+  workload = None
+  if config.workload:
+    from workload import Workload
+    workload = Workload(config.workload)
+
+  # Create list of requests of data items for clients
+  clients = Clients(config.clients, data_items, DOWN_STREAM, config.min_data_items, config.max_data_items, config.client_seed, config.client_sleep_interval, config.long_running, config.max_in_flight, workload, config.request_rounds, config.client_cache_size, shard)
+
+  # Scheduler called by the server in each cycle
+  options = {}
+  if config.scheduler == "mtrs":
+    options = {"workers": config.mtrs_workers, "parallel_threshold": config.mtrs_parallel_threshold}
+  scheduler = create_scheduler(config.scheduler, data_items, config.bandwidth, config.time_slot, config.delta, config.debug, config.benchmark, **options)
+
+  # Adaptive mode replaces the fixed delta
+  delta_controller = None
+  if config.adaptive_delta:
+    delta_controller = DeltaController(config.delta, config.min_delta, config.max_delta, config.delta_step)
+
+  # Capture mode saves the scheduling cycles with the settings needed to replay them
+  capture = None
+  if config.capture:
+    from capture import CycleCapture
+    capture = CycleCapture(config.capture, {"scheduler": config.scheduler, "options": options, "bandwidth": config.bandwidth, "time_slot": config.time_slot, "delta": config.delta})
+
+  # Long-running mode keeps compact records of the finished requests
+  records = None
+  if config.long_running:
+    records = CompletionRecords(config.metrics_file)
 
-  # Create list of requests of data items for clients 
-  clients = Clients(CLIENTS, data_items, DOWN_STREAM, MIN_DATA_ITEMS, MAX_DATA_ITEMS, CLIENT_SEED, CLIENT_SLEEP_INTERVAL)
-  
   # Clients are connected to the server
-  server = Server(clients, data_items, DOWN_STREAM, BANDWIDTH, TIME_SLOT, DELTA)
+  server = Server(clients, data_items, DOWN_STREAM, config.bandwidth, config.time_slot, config.delta, config.online_scheduling, config.replan_interval, config.debug, config.benchmark, records, scheduler, delta_controller, capture)
 
   # Benchmark information
   benchmark_info = BenchmarkUtilities(clients, server)
@@ -44,24 +54,70 @@ def init():
   return clients, server, benchmark_info
 
 
-if __name__ == '__main__':
-
+# Run the simulation in this process and print the benchmark information
+def run(config):
   # Initialize Clients and Server
-  clients, server, benchmark_info = init()
+  clients, server, benchmark_info = init(config)
 
   # Start of execution time
   start = timeit.default_timer()
-  
+
   # Send requests to server
   clients.send_requests()
-  
+
   # Server responds to clients
   server.send_response()
 
   # End of execution time
   stop = timeit.default_timer()
 
+  if server.records is not None:
+    server.records.close()
+
+  if server.capture is not None:
+    server.capture.close()
 
 
+
+  print('Scheduler: ', config.scheduler)
   print('AAL: ', benchmark_info.get_total_AAL())
-  print('Total Time of Execution: ', stop - start)  
+  print('Total Time of Execution: ', stop - start)
+  print('Throughput (requests/s): ', benchmark_info.get_throughput(stop - start))
+  print('Cycles: ', benchmark_info.get_cycles())
+  print('Average Scheduling Time per Cycle: ', benchmark_info.get_average_scheduling_time())
+  print('Solver Time: ', benchmark_info.get_solve_time())
+  if config.scheduler == "mtrs":
+    print('MTRS Components: ', benchmark_info.get_components())
+  print('Duplicate Data Items Skipped: ', benchmark_info.get_duplicate_data_items())
+  print('Saved Airtime (timeslots): ', benchmark_info.get_saved_airtime())
+  print('Re-plans: ', benchmark_info.get_replans())
+  print('Delta (average, min, max): ', benchmark_info.get_delta())
+  print('Data Items Requested from Server: ', benchmark_info.get_requested_data_items())
+  print('Client Cache Hit Rate: ', benchmark_info.get_cache_hit_rate())
+
+
+# Run a server per shard of the data items in separate processes and print the combined benchmark information
+def run_shards(config):
+  from sharding import run_sharded
+
+  summary = run_sharded(config)
+
+  print('Scheduler: ', config.scheduler)
+  print('Shards: ', config.shards)
+  print('AAL: ', summary["AAL"])
+  print('Total Time of Execution: ', summary["execution_time"])
+  print('Throughput (requests/s): ', summary["throughput"])
+  for shard in summary["shards"]:
+    print('Shard {}: AAL: {}, Total Time: {}, Cycles: {}, Solver Time: {}, Data Items Requested: {}'.format(
+      shard["shard"], shard["AAL"], shard["execution_time"], shard["cycles"], shard["solve_time"], shard["requested_data_items"]))
+
+
+if __name__ == '__main__':
+
+  # Configuration from the defaults in config.py, the environment and the command line
+  config = Config.from_args()
+
+  if config.shards > 1:
+    run_shards(config)
+  else:
+    run(config)
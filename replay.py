@@ -0,0 +1,60 @@
+import argparse
+import timeit
+from capture import load_metadata, load_cycle
+from schedulers import create_scheduler
+
+
+# Run a scheduler on the cycles of a capture directory with the captured time and delta.
+# Returns the number of cycles, the cycles whose schedule differs from the capture and the scheduling time
+def replay(path, scheduler_name=None, repeat=1, **options):
+  metadata = load_metadata(path)
+  if scheduler_name is None:
+    scheduler_name = metadata["scheduler"]
+    options = dict(metadata["options"], **options)
+
+  # The schedulers only read the data items of the pending requests
+  scheduler = create_scheduler(scheduler_name, None, metadata["bandwidth"], metadata["time_slot"], metadata["delta"], False, True, **options)
+
+  mismatches = []
+  scheduling_time = 0
+  try:
+    for cycle in range(metadata["cycles"]):
+      pending, current_time, delta, captured = load_cycle(path, cycle)
+      scheduler.delta = delta
+
+      for _ in range(repeat):
+        start = timeit.default_timer()
+        schedule = scheduler.schedule(pending, current_time)
+        scheduling_time += timeit.default_timer() - start
+
+      if [data_item.get_index() for data_item in schedule] != captured:
+        mismatches.append(cycle)
+  finally:
+    scheduler.close()
+
+  return metadata["cycles"], mismatches, scheduling_time / repeat
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Replay captured scheduling cycles without clients and compare the schedules")
+  parser.add_argument("path", help="Capture directory")
+  parser.add_argument("--scheduler", default=None, help="Scheduler to run, the captured scheduler by default")
+  parser.add_argument("--mtrs-workers", type=int, default=None)
+  parser.add_argument("--mtrs-parallel-threshold", type=int, default=None)
+  parser.add_argument("--repeat", type=int, default=1, help="Runs of each cycle, the time is averaged")
+  arguments = parser.parse_args()
+
+  options = {}
+  if arguments.mtrs_workers is not None:
+    options["workers"] = arguments.mtrs_workers
+  if arguments.mtrs_parallel_threshold is not None:
+    options["parallel_threshold"] = arguments.mtrs_parallel_threshold
+
+  cycles, mismatches, scheduling_time = replay(arguments.path, arguments.scheduler, arguments.repeat, **options)
+
+  print('Cycles: ', cycles)
+  print('Scheduling Time: ', scheduling_time)
+  print('Average Scheduling Time per Cycle: ', scheduling_time / cycles if cycles else 0)
+  print('Matching Schedules: ', cycles - len(mismatches))
+  if mismatches:
+    print('Different Schedules: ', mismatches)
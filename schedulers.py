@@ -0,0 +1,709 @@
+from utilities import colored
+import math
+import json
+import sys
+import timeit
+# PuLP, NumPy and the process pool are imported by the MTRS methods that use them
+
+
+# Base class of the on-demand broadcast schedulers. The server calls schedule
+# once per cycle with the pending requests (L) and broadcasts the returned data items (V)
+class Scheduler:
+  def __init__(self, data_items, bandwidth=10, time_slot=1, delta=4, debug=False, benchmark=False):
+    self.data_items = data_items
+
+    # Server related information for throughput computation
+    self.bandwidth = bandwidth * 1024
+    self.timeslots = time_slot
+
+    # Maximum time slots of a broadcast cycle
+    self.delta = delta
+
+    # Settings to control stdout
+    self.debug = debug
+    self.benchmark = benchmark
+
+    # Time spent in the optimization solver
+    self.solve_time = 0
+
+
+  # Return the data items to broadcast in order. A data item may be returned more than once
+  def schedule(self, pending, current_time):
+    raise NotImplementedError
+
+
+  # Return the unsent data items of an online broadcast in the order they should be broadcast.
+  # Data items that no pending request needs anymore are dropped and the order is kept
+  def replan(self, pending, unsent, current_time):
+    return [data_item for data_item in unsent if any(request.get_indexed_data_item(data_item.get_index()) is not None for request in pending)]
+
+
+  # Release the resources of the scheduler
+  def close(self):
+    pass
+
+
+  # Calculate time slots based on the size of the data item and throughput of the server
+  def calculate_time(self, size):
+    return math.ceil(size / (self.bandwidth * self.timeslots))
+
+
+# Scheduler that performs MTRS, Least Lost Heuristic and MLRO
+class MTRSScheduler(Scheduler):
+  def __init__(self, data_items, bandwidth=10, time_slot=1, delta=4, debug=False, benchmark=False, workers=1, parallel_threshold=50):
+    super().__init__(data_items, bandwidth, time_slot, delta, debug, benchmark)
+
+    # Independent components of the MTRS are solved in up to workers processes
+    # when at least two of them have parallel_threshold requests or more
+    self.workers = workers
+    self.parallel_threshold = parallel_threshold
+    self.executor = None
+
+    # Total number of components that were solved
+    self.components = 0
+
+    # Pending requests and time of the cycle that is scheduled
+    self.pending = []
+    self.current_time = 0
+
+
+  # Perform MTRS, Pruning and MLRO to get the data items of the broadcast channel
+  def schedule(self, pending, current_time):
+    self.pending = pending
+    self.current_time = current_time
+
+    # Apply the MTRS to get a maximum throughput request set Q
+    Q = self.__mtrs()
+
+    # Print Q for debuging purposes
+    if self.debug:
+      print(json.dumps(Q, indent=2))
+
+    # Calculate T(Q)
+    time_to_send = self.__time_to_send_requests(Q)
+
+    # Perform a pruning algorithm
+    if time_to_send > self.delta:
+      self.__least_lost_heuristic(Q)
+
+      # Print Q for debuging purposes
+      if self.debug:
+        print(json.dumps(Q, indent=2))
+
+    # Apply the MLRO to optimize for latency
+    S = self.__mlro(Q)
+    
+    # Print Q for debuging purposes
+    if self.debug:
+      print(json.dumps(S, indent=2))
+
+    # Put items into V in the MLRO order
+    V = []
+    for request in S:
+      for data in request["data"]:
+        V.append(self.pending[data["request_index"]].get_indexed_data_item(data["data_index"]))
+
+    return V
+
+
+  # Reorder the unsent data items based on the MLRO priority of Equation 3 at the current time
+  def replan(self, pending, unsent, current_time):
+    priorities = {}
+    for data_item in unsent:
+      priorities[data_item.get_index()] = data_access_latency(pending, current_time, data_item.get_index())
+
+    # Data items that no pending request needs anymore are dropped
+    unsent = [data_item for data_item in unsent if priorities[data_item.get_index()]]
+    unsent.sort(key=lambda data_item: priorities[data_item.get_index()], reverse=True)
+
+    return unsent
+
+
+  # Calculate time to send request T(Q), data items shared by requests are broadcast once
+  def __time_to_send_requests(self, Q):
+    # Time of each distinct data item of D(Q)
+    times = {}
+    for request in Q:
+      for data in request["data"]:
+        times[data["data_index"]] = data["time"]
+    
+    return sum(times.values())
+
+
+  # Perform the MLRO to optimize for latency
+  def __mlro(self, Q):
+    if not self.benchmark:
+      print(colored("Performing the MLRO Algorithm", "GREEN"))
+    
+    # W <- D(Q)
+    W = self.__populate_remainder_data_items(Q)
+
+    # n = |D(Q)|
+    n = len(W)
+    
+    # Optimal schedule  
+    if n <= len(Q):
+      # Equations (3) and (4)
+      if not self.benchmark:
+        print("Appling Equations 3 and 4")
+      return self.__data_optimal_schedule(Q, W)
+
+    else:
+      # Equations (5) and (6)
+      if not self.benchmark:
+        print("Appling Equations 5 and 6")
+      return self.__request_optimal_schedule(Q)
+
+
+  # MLRO helper equations (3, 4) and (5, 6)
+  def __data_optimal_schedule(self, Q, W):
+    current_time = self.current_time
+    
+    # Data order
+    order = []
+    
+    # Find data item that minimized AAL
+    while True:
+      # Equation 3
+      AAL = 0
+      lowest_latency_data_item = None
+      for data in W:
+        latency = self.__data_average_access_latency(current_time, data["data_index"])
+
+        if AAL < latency:
+          AAL = latency
+          lowest_latency_data_item = data
+    
+      # No data item was found
+      if not AAL:
+        break
+      
+      # Equation 4
+      order.append(lowest_latency_data_item)
+      W.remove(lowest_latency_data_item)
+
+    # Rearrange data items in requests based on the order
+    for request in Q:
+      for data in request["data"]:
+        # Calculate a weight for each data item to rearrange based on the weight
+        self.__calculate_weight(data, order)
+      request["data"].sort(key=lambda item: item["weight"], reverse=True)
+
+    return Q
+    
+  # Helper for MLOR to calculate weights of each request
+  def __calculate_weight(self, data_item, order):
+    for i in range(len(order)):
+      if order[i]["data_index"] != data_item["data_index"]:
+        continue
+      data_item["weight"] = i
+  
+
+  # Calculate access latency for each data item
+  def __data_average_access_latency(self, current_time, data_index):
+    return data_access_latency(self.pending, current_time, data_index)
+
+
+  # Optimal MLRO schedule with bottom-up approach
+  def __request_optimal_schedule(self, Q):
+    current_time = self.current_time
+    
+    S = []
+    # Find request that minimized AAL
+    while True:
+      # Equation 5
+      AAL = 0
+      lowest_latency_request = None
+      for request in Q:
+        latency = self.__request_average_access_latency(current_time, request["request"]["request_index"])
+
+        if AAL < latency:
+          AAL = latency
+          lowest_latency_request = request
+      
+      # No request was found
+      if not AAL:
+        break
+      
+      # Equation 6
+      S.append(lowest_latency_request)
+      Q.remove(lowest_latency_request)
+
+    return S
+
+
+  # Calculate the AAL of a request Q
+  def __request_average_access_latency(self, current_time, request_index):
+    AAL = current_time - self.pending[request_index].submitted_request_time
+
+    # Check for identical data items sets
+    for i in range(len(self.pending)):
+      if i == request_index:
+        continue
+      
+      # Identical data items
+      if self.pending[i] == self.pending[request_index].request:
+        AAL += current_time - self.pending[i].submitted_request_time
+    
+    return AAL
+
+
+  # Least Lost Heuristic Algorithm that returns an updated requests list Q
+  def __least_lost_heuristic(self, Q):
+    if not self.benchmark:
+      print(colored("Performing Least Loss Heuristic Algorithm", "RED"))
+    
+
+    # W <- D(Q)
+    W = self.__populate_remainder_data_items(Q)
+
+    # Find item such that |Q| / t(d) is minimized
+    while self.__time_to_send_requests(Q) > self.delta:
+      minimized = sys.maxsize
+      minimized_data_item = None
+      for data in W:        
+        total_requests_containing_data_item = self.__total_requests_containing_data_item(Q, data['data_index'])
+        if minimized > total_requests_containing_data_item:
+          minimized = total_requests_containing_data_item
+          minimized_data_item = data
+        
+      
+      # This is NOT mentioned by the paper but helps to avoid starvation on large requests
+      if len(Q) < 2:
+        break
+      
+      # Delete d from W and delete Q that includes d
+      W.remove(minimized_data_item)
+      self.__remove_requests_conaining_data_item(Q, minimized_data_item)
+      
+    return Q
+
+
+  # Delete requests that contain a certain data item
+  def __remove_requests_conaining_data_item(self, Q, data_item):
+    for request in Q[:]:
+      for data in request["data"]:
+        if data != data_item:
+          continue
+        Q.remove(request)
+
+
+  # Get request based on its index
+  def __get_request_by_index(self, Q, index):
+    for request in Q:
+      if request["request"]["request_index"] != index:
+        continue
+        
+      return request
+    return None
+
+
+  # Least lost heuristic: |{Q | Q ∈ Q, d ∈ D(Q)}|
+  def __total_requests_containing_data_item(self, Q, index):
+    total_requests = 0
+
+    for request in Q:
+      for data in request["data"]:
+        if data["data_index"] != index:
+          continue
+        total_requests += 1
+
+    return total_requests
+    
+
+  # Helper function to populate remainder data items W
+  def __populate_remainder_data_items(self, Q):
+    W = []
+    for request in Q:
+      for data in request["data"]:
+        W.append(data)
+    
+    return W
+
+ 
+  # Perform the MTRS algorithm to optimize for throughput
+  def __mtrs(self):
+    if not self.benchmark:
+      print(colored("Performing the MTRS Algorithm", "GREEN"))
+
+    start = timeit.default_timer()
+    x, y = self.__solve_components()
+    self.solve_time += timeit.default_timer() - start
+   
+    # n <- max(x_i)
+    n = -1
+    for request in x:
+      try:
+        if request["value"] > n:
+          n = request["value"]
+      except:
+          print("[ERROR] MTRS")
+
+    if n < 0:
+      return None
+
+    Q = []
+    # x_i = (x_i < n) ? 0 : 1
+    for request in x:
+      try:
+        if request["value"] < n:
+          request["value"] = 0
+        else:
+          request["value"] = 1
+          
+          D_Q = []
+          for data in y:
+            if data["request_index"] != request["request_index"]:
+              continue
+            
+            # Append only data items that are actually included in the result
+            data["value"] = 1
+            D_Q.append(data)
+
+          Q.append({"request": request, "data": D_Q})
+      except:
+          print("[ERROR] MTRS")
+
+
+    # y_j = (yj belongs to D_Q) ? 1 : 0
+    for data in y:
+      if self.__is_data_in_Q(Q, data["data_index"]):
+        data["value"] = 1
+      else:
+        data["value"] = 0
+      
+    return Q
+
+
+  # Check if data item is included in the request
+  def __is_data_in_Q(self, Q, index):
+    for request in Q:
+      for data in request["data"]:
+        if data["data_index"] != index:
+          continue
+        return True
+    
+    return False
+    
+
+  # Split the pending requests into connected components of the graph where
+  # requests are connected when they share a data item. Returns lists of request indices
+  def __components(self):
+    # Union-find over the request indices
+    parent = list(range(len(self.pending)))
+
+    def find(index):
+      while parent[index] != index:
+        parent[index] = parent[parent[index]]
+        index = parent[index]
+      return index
+
+    # First request that needs each data item
+    owners = {}
+    for request_index, request in enumerate(self.pending):
+      for data_item in request.get_outstanding():
+        owner = owners.setdefault(data_item.get_index(), request_index)
+        parent[find(request_index)] = find(owner)
+
+    components = {}
+    for request_index in range(len(self.pending)):
+      components.setdefault(find(request_index), []).append(request_index)
+    
+    return list(components.values())
+
+
+  # Solve the MTRS of the components. When there is more than one component with at least
+  # parallel_threshold requests, those are solved in a process pool. All other components are
+  # solved together in a single model, since starting the solver for each small component costs
+  # more than the model itself. Returns x and y like a single model
+  def __solve_components(self):
+    problems = []
+    for component in self.__components():
+      problem = []
+      for request_index in component:
+        times = {}
+        for data_item in self.pending[request_index].get_outstanding():
+          # Calculate send data time for each item in the request 
+          times[data_item.get_index()] = self.calculate_time(data_item.get_size())
+        problem.append((request_index, times))
+      problems.append(problem)
+
+    self.components += len(problems)
+
+    large = [problem for problem in problems if len(problem) >= self.parallel_threshold]
+    if self.workers > 1 and len(large) > 1:
+      problems = [problem for problem in problems if len(problem) < self.parallel_threshold]
+      solutions = list(self.__get_executor().map(solve_mtrs_component, large))
+    else:
+      solutions = []
+    
+    # Remaining components in a single model
+    remaining = [request for problem in problems for request in problem]
+    if remaining:
+      solutions.append(solve_mtrs_component(remaining))
+
+    # Preprocess results to the format of the PuLP variables
+    x = []
+    y = []
+    for x_values, y_values in solutions:
+      for request_index, value in x_values.items():
+        x.append({"name": "X_{}".format(request_index + 1), "value": value, "request_index": request_index})
+
+      for (request_index, data_index), (value, time) in y_values.items():
+        y.append({
+          "name": "Y_{}_{}".format(request_index + 1, data_index + 1), 
+          "value": value, 
+          "request_index": request_index, 
+          "data_index": data_index, 
+          "time": time,
+          "weight": 0
+        })
+
+    # Same order as the variables of a single PuLP model
+    x.sort(key=lambda item: item["name"])
+    y.sort(key=lambda item: item["name"])
+    
+    return x, y
+
+
+  # Process pool used to solve large components, started with the first use
+  def __get_executor(self):
+    if self.executor is None:
+      from concurrent.futures import ProcessPoolExecutor
+      import multiprocessing
+
+      # Spawn the workers since the server process runs the client threads
+      self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+    
+    return self.executor
+
+
+  # Stop the process pool
+  def close(self):
+    if self.executor is not None:
+      self.executor.shutdown()
+      self.executor = None
+
+
+# Base class of the schedulers that rank each requested data item on its own.
+# Data items are broadcast in priority order till the cycle reaches delta time slots
+class DataItemScheduler(Scheduler):
+  def schedule(self, pending, current_time):
+    statistics = self.__statistics(pending, current_time)
+    ranking = sorted(statistics.values(), key=lambda item_statistics: self.priority(*item_statistics[1:]), reverse=True)
+
+    V = []
+    time_to_send = 0
+    for item_statistics in ranking:
+      data_item = item_statistics[0]
+      time_to_send += self.calculate_time(data_item.get_size())
+
+      # At least one data item is broadcast in each cycle
+      if V and time_to_send > self.delta:
+        break
+
+      V.append(data_item)
+
+    return V
+
+
+  # Reorder the unsent data items by the priority of the scheduler at the current time
+  def replan(self, pending, unsent, current_time):
+    statistics = self.__statistics(pending, current_time)
+
+    # Data items that no pending request needs anymore are dropped
+    unsent = [data_item for data_item in unsent if data_item.get_index() in statistics]
+    unsent.sort(key=lambda data_item: self.priority(*statistics[data_item.get_index()][1:]), reverse=True)
+
+    return unsent
+
+
+  # Return the priority of a data item, the highest priority is broadcast first
+  def priority(self, requests, total_waiting_time, longest_waiting_time):
+    raise NotImplementedError
+
+
+  # Data item index -> [data item, pending requests, total waiting time, longest waiting time]
+  def __statistics(self, pending, current_time):
+    statistics = {}
+    for request in pending:
+      for data_item in request.get_outstanding():
+        waiting_time = current_time - data_item.get_submitted_time()
+
+        item_statistics = statistics.get(data_item.get_index())
+        if item_statistics is None:
+          statistics[data_item.get_index()] = [data_item, 1, waiting_time, waiting_time]
+          continue
+
+        item_statistics[1] += 1
+        item_statistics[2] += waiting_time
+        item_statistics[3] = max(item_statistics[3], waiting_time)
+
+    return statistics
+
+
+# R x W: pending requests multiplied by the longest waiting time
+class RxWScheduler(DataItemScheduler):
+  def priority(self, requests, total_waiting_time, longest_waiting_time):
+    return requests * longest_waiting_time
+
+
+# Longest Wait First: total waiting time of the pending requests
+class LWFScheduler(DataItemScheduler):
+  def priority(self, requests, total_waiting_time, longest_waiting_time):
+    return total_waiting_time
+
+
+# Most Requests First: number of pending requests, ties are broken by the waiting time
+class MRFScheduler(DataItemScheduler):
+  def priority(self, requests, total_waiting_time, longest_waiting_time):
+    return (requests, longest_waiting_time)
+
+
+# First Come First Served: the data item of the oldest pending request
+class FCFSScheduler(DataItemScheduler):
+  def priority(self, requests, total_waiting_time, longest_waiting_time):
+    return longest_waiting_time
+
+
+# PuLP model for the MTRS of one or more components given as a list of (request index, {data index: t(d)}).
+# Returns the values of x_i and the values and times of y_ij for the data items of each request
+def solve_mtrs_component(problem):
+  from pulp import LpProblem, LpMaximize, LpVariable, PULP_CBC_CMD, lpSum
+
+  # Source for solving optimization problems using linear programming 
+  # with PuLP: https://towardsdatascience.com/linear-programming-using-python-priyansh-22b5ee888fe0
+
+  model = LpProblem("MTRS", LpMaximize)
+
+  # Decision variables 0 <= x, y <= 1
+  x = {}
+  y = {}
+  for request_index, times in problem:
+    x[request_index] = LpVariable("X_{}".format(request_index + 1), lowBound=0, upBound=1, cat="Continuous")
+    for data_index in times:
+      y[request_index, data_index] = LpVariable("Y_{}_{}".format(request_index + 1, data_index + 1), lowBound=0, upBound=1, cat="Continuous")
+
+  # Build the objective function
+  model += lpSum(x.values())
+
+  for request_index, times in problem:
+    # sum for all d_j of (t(d_j) * y_j) <= 1
+    model += lpSum(time * y[request_index, data_index] for data_index, time in times.items()) <= 1
+
+    # x_i <= y_i with d_j belongs to D(Q_i)
+    for data_index in times:
+      model += x[request_index] - y[request_index, data_index] <= 0
+  
+  # Solve the model and hide log message
+  model.solve(PULP_CBC_CMD(msg=False))
+
+  x_values = {request_index: variable.value() for request_index, variable in x.items()}
+  y_values = {}
+  for request_index, times in problem:
+    for data_index, time in times.items():
+      y_values[request_index, data_index] = (y[request_index, data_index].value(), time)
+
+  return x_values, y_values
+
+
+# Access latency of a data item (Equation 3), the sum of
+# the waiting times of the pending requests that need it
+def data_access_latency(pending, current_time, data_index):
+  AAL = 0
+
+  for request in pending:
+    data = request.get_indexed_data_item(data_index)
+    if data is None:
+      continue
+    
+    AAL += current_time - data.get_submitted_time()
+  
+  return AAL
+
+
+# Adjusts delta before each cycle within [minimum, maximum] time slots.
+# A growing backlog or a solver that takes a large share of the cycle makes the cycles
+# longer, so more requests are served per cycle and the solver time is amortized.
+# A rising latency without a growing backlog makes the cycles shorter, so new requests
+# are scheduled sooner. Latencies are smoothed with an exponential moving average
+class DeltaController:
+  def __init__(self, delta=4, minimum=2, maximum=16, step=1, smoothing=0.5, solver_share=0.25):
+    self.delta = min(max(delta, minimum), maximum)
+    self.minimum = minimum
+    self.maximum = maximum
+    self.step = step
+    self.smoothing = smoothing
+
+    # Largest share of the cycle that the scheduler may take before delta grows
+    self.solver_share = solver_share
+
+    # Observations of the previous cycle
+    self.latency = None
+    self.previous_latency = None
+    self.previous_pending = 0
+
+    # Chosen delta of all cycles
+    self.cycles = 0
+    self.total_delta = 0
+    self.lowest_delta = self.delta
+    self.highest_delta = self.delta
+
+
+  # Add the latency of a finished request
+  def add_latency(self, latency):
+    if self.latency is None:
+      self.latency = latency
+    else:
+      self.latency = self.smoothing * latency + (1 - self.smoothing) * self.latency
+
+
+  # Return the delta of the next cycle given the number of pending
+  # requests and the time in seconds the scheduler took for the last cycle
+  def update(self, pending_count, scheduling_time):
+    delta = self.delta
+
+    if pending_count > self.previous_pending:
+      delta += self.step
+    elif self.latency is not None and self.previous_latency is not None and self.latency > self.previous_latency:
+      delta -= self.step
+
+    if scheduling_time > self.solver_share * delta:
+      delta += self.step
+
+    self.delta = min(max(delta, self.minimum), self.maximum)
+    self.previous_pending = pending_count
+    self.previous_latency = self.latency
+
+    self.cycles += 1
+    self.total_delta += self.delta
+    self.lowest_delta = min(self.lowest_delta, self.delta)
+    self.highest_delta = max(self.highest_delta, self.delta)
+
+    return self.delta
+
+
+  # Return the average delta of the cycles
+  def get_average_delta(self):
+    if not self.cycles:
+      return self.delta
+
+    return self.total_delta / self.cycles
+
+
+# Available schedulers by name
+SCHEDULERS = {
+  "mtrs": MTRSScheduler,
+  "rxw": RxWScheduler,
+  "lwf": LWFScheduler,
+  "mrf": MRFScheduler,
+  "fcfs": FCFSScheduler,
+}
+
+
+# Create a scheduler by its name, options are passed to the constructor of the scheduler
+def create_scheduler(name, data_items, bandwidth=10, time_slot=1, delta=4, debug=False, benchmark=False, **options):
+  if name not in SCHEDULERS:
+    raise ValueError("Unknown scheduler: {}, available schedulers: {}".format(name, ", ".join(SCHEDULERS)))
+
+  return SCHEDULERS[name](data_items, bandwidth, time_slot, delta, debug, benchmark, **options)
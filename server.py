@@ -1,15 +1,12 @@
-from utilities import BENCHMARK, DEBUG, RequestStatus
-from pulp import *
-import numpy as np
+from schedulers import Scheduler, create_scheduler
 import math
-from colorama import Fore, Style
-import sys
 import time
-from utilities import DEBUG, BENCHMARK # Settings to control stdout
+import timeit
+import queue
 
 
 class Server:
-  def __init__(self, clients, data_items, DOWN_STREAM, bandwidth=10, time_slot=1, delta=4):
+  def __init__(self, clients, data_items, DOWN_STREAM, bandwidth=10, time_slot=1, delta=4, online=False, replan_interval=1, debug=False, benchmark=False, records=None, scheduler="mtrs", delta_controller=None, capture=None):
     # Connection with Clients
     self.clients = clients
     self.data_items = data_items
@@ -18,12 +15,49 @@ class Server:
     self.bandwidth = bandwidth * 1024
     self.timeslots = time_slot
 
+    # Scheduler called once per cycle, given by name or as a Scheduler instance
+    if not isinstance(scheduler, Scheduler):
+      scheduler = create_scheduler(scheduler, data_items, bandwidth, time_slot, delta, debug, benchmark)
+    self.scheduler = scheduler
+
+    # Adaptive mode sets the delta of the scheduler before each cycle
+    self.delta_controller = delta_controller
+    self.last_scheduling_time = 0
+
+    # Capture mode saves the inputs and the result of each cycle for offline replay
+    self.capture = capture
+
+    # Number of cycles and time spent in the scheduler
+    self.cycles = 0
+    self.scheduling_time = 0
+
     # Scheduling related information
-    self.delta = delta
-    self.pending = []   # L
+    self.pending = {}   # L, client id -> client in the order the requests arrived
     self.completed = [] # C
+    self.completed_count = 0
     self.broadcast = [] # V
     self.downstream = DOWN_STREAM
+
+    # Long-running mode streams a compact record of each finished request
+    # instead of keeping the finished clients in the completed list
+    self.records = records
+
+    # Data items shared by the scheduled requests are broadcast once per cycle.
+    # Keep the number of duplicates skipped and their download time in timeslots
+    self.duplicate_data_items = 0
+    self.saved_airtime = 0
+
+    # Online mode broadcasts V one data item at a time and adds the data items of requests that
+    # arrive to the unsent data items, with at least replan_interval data items between two re-plans
+    self.online = online
+    self.replan_interval = replan_interval
+    self.replans = 0
+
+    # Data items the clients requested from the server and the
+    # cache hits and misses of the clients' requests
+    self.requested_data_items = 0
+    self.cache_hits = 0
+    self.cache_misses = 0
     
 
   @property
@@ -34,494 +68,228 @@ class Server:
   # Functions that handles sending responses with the help of the scheduler
   def send_response(self):
     while True:
-      clients = self.clients.get_clients()
-      if not clients:
-        return
-
       #Populate pending list (put Q into L)
-      self.__receive_requests(clients)
+      self.__receive_requests()
       
-      for request in self.pending[:]:
-        if not request.request:
-          self.pending.remove(request)
-          self.completed.append(request)
-      
-      if len(self.completed) != self.clients.client_count:
+      if self.completed_count != self.clients.client_count:
         if not self.pending:
+          # Block till the next request arrives instead of polling the clients
+          self.__receive_request(self.clients.arrivals.get())
           continue
       else:
+        self.scheduler.close()
         break
 
-      # Run MTRS, Least Lost Heuristic and MLRO
+      # Run the scheduler, MTRS, Least Lost Heuristic and MLRO by default
       self.__scheduler()
 
-      download_timeslots = 0
-      # Calculate time to actually download items from client side
-      for data in self.broadcast:
-        download_timeslots = download_timeslots + (data.get_size() / (self.bandwidth * self.timeslots)) # 
-      
-      # Write to downstream
-      self.downstream.extend(self.broadcast[:])
-      
-      # Wait for a certain amount of timeslots to begin sending 
-      download_timeslots = math.ceil(download_timeslots)
-      
-      time.sleep(download_timeslots)
+      if self.online:
+        self.__online_broadcast()
+      else:
+        download_timeslots = 0
+        # Calculate time to actually download items from client side
+        for data in self.broadcast:
+          download_timeslots = download_timeslots + self.__download_time(data.get_size())
 
-      # Up clients semaphores to enable receiving
-      for client in self.clients.get_clients():
-        if client.request_received():
-          client.semaphore.release()
-      
-      # Wait for clients to receive data
-      for client in self.clients.get_clients():
-        if client.request_received(): 
-          while client.semaphore._value != 0 and client.get_status() != RequestStatus.FINISHED: # Can be improved to avoid active waiting
-            continue
+        # Wait for a certain amount of timeslots to begin sending 
+        self.__broadcast(self.broadcast, math.ceil(download_timeslots))
       
       # Dequeue items from list (completely delete it)
       self.broadcast.clear()
-      
-
-  # Perform MTRS, Pruning and MLRO to populate the self.broadcast channel    
-  def __scheduler(self):
-    if not self.broadcast:
-      # Apply the MTRS to get a maximum throughput request set Q
-      Q = self.__mtrs()
-
-      # Print Q for debuging purposes
-      if DEBUG:
-        print(json.dumps(Q, indent=2))
-
-      # Calculate T(Q)
-      time_to_send = self.__time_to_send_requests(Q)
- 
-      # Perform a pruning algorithm
-      if time_to_send > self.delta:
-        self.__least_lost_heuristic(Q)
-
-        # Print Q for debuging purposes
-        if DEBUG:
-          print(json.dumps(Q, indent=2))
-
-      # Apply the MLRO to optimize for latency
-      S = self.__mlro(Q)
-      
-      # Print Q for debuging purposes
-      if DEBUG:
-        print(json.dumps(S, indent=2))
-
-      # Create broadcast channel populated with data items
-      # Put items into V
-      for request in S:
-        for data in request["data"]:
-          self.broadcast.append(self.pending[data["request_index"]].get_indexed_data_item(data["data_index"]))
-              
-
-  # Calculate time to send request
-  def __time_to_send_requests(self, Q):
-    # Q is empty
-    if not Q:
-      return 0
-    
-     # Calculate time to send Q
-    time = 0
-    for request in Q:
-      for data in request["data"]:
-        time += data["time"]
-    
-    return time
 
 
-  # Perform the MLRO to optimize for latency
-  def __mlro(self, Q):
-    if not BENCHMARK:
-      print(Fore.GREEN + "Performing the MLRO Algorithm" + Style.RESET_ALL)
-    
-    # W <- D(Q)
-    W = self.__populate_remainder_data_items(Q)
-
-    # n = |D(Q)|
-    n = len(W)
+  # Write data items to the downstream and wait till the pending clients receive them
+  def __broadcast(self, data_items, download_timeslots):
+    # Write to downstream
+    self.downstream.extend(data_items)
     
-    # Optimal schedule  
-    if n <= len(Q):
-      # Equations (3) and (4)
-      if not BENCHMARK:
-        print("Appling Equations 3 and 4")
-      return self.__data_optimal_schedule(Q, W)
+    time.sleep(download_timeslots)
 
-    else:
-      # Equations (5) and (6)
-      if not BENCHMARK:
-        print("Appling Equations 5 and 6")
-      return self.__request_optimal_schedule(Q)
-
-
-  # MLRO helper equations (3, 4) and (5, 6)
-  def __data_optimal_schedule(self, Q, W):
-    current_time = time.time()
-    
-    # Data order
-    order = []
-    
-    # Find data item that minimized AAL
-    while True:
-      # Equation 3
-      AAL = 0
-      lowest_latency_data_item = None
-      for data in W:
-        latency = self.__data_average_access_latency(current_time, data["data_index"])
-
-        if AAL < latency:
-          AAL = latency
-          lowest_latency_data_item = data
+    # Up clients semaphores to enable receiving
+    for client in self.pending.values():
+      client.semaphore.release()
     
-      # No data item was found
-      if not AAL:
+    # Wait for clients to receive data. Finished clients
+    # are reported in the completions queue before acknowledging
+    for client in self.pending.values():
+      client.acknowledge.acquire()
+
+    # The downstream only keeps the current broadcast, requests
+    # received later listen to the data items broadcast after their arrival
+    self.downstream.clear()
+    for client in self.pending.values():
+      client.downstream_position = 0
+
+
+  # Broadcast V one data item at a time. Each data item is received after its own download
+  # time and the cycle is rounded up to whole time slots, so a cycle takes the same airtime as
+  # in the offline mode. The unsent data items are re-ranked after every data item.
+  # Requests that arrive in the meantime trigger a re-plan that adds their data items to
+  # the unsent data items, with at least replan_interval data items between two re-plans
+  def __online_broadcast(self):
+    slots = 0
+    airtime = 0
+    arrivals = []
+    while self.broadcast:
+      data_item = self.broadcast.pop(0)
+      download_time = self.__download_time(data_item.get_size())
+      self.__broadcast([data_item], download_time)
+      airtime += download_time
+      slots += 1
+
+      # Receive the requests that arrived and the ones that finished during the slot
+      arrivals += self.__receive_requests()
+      if not self.broadcast:
         break
-      
-      # Equation 4
-      order.append(lowest_latency_data_item)
-      W.remove(lowest_latency_data_item)
-
-    # Rearrange data items in requests based on the order
-    for request in Q:
-      for data in request["data"]:
-        # Calculate a weight for each data item to rearrange based on the weight
-        self.__calculate_weight(data, order)
-      request["data"].sort(key=lambda item: item["weight"], reverse=True)
-
-    return Q
-    
-  # Helper for MLOR to calculate weights of each request
-  def __calculate_weight(self, data_item, order):
-    for i in range(len(order)):
-      if order[i]["data_index"] != data_item["data_index"]:
-        continue
-      data_item["weight"] = i
-  
 
-  # Calculate access latency for each data item
-  def __data_average_access_latency(self, current_time, data_index):
-    AAL = 0
+      if arrivals and slots >= self.replan_interval:
+        self.__replan(arrivals)
+        arrivals = []
+        slots = 0
 
-    for request in self.pending:
-      for data in request.request:
-        if data.get_index() != data_index:
-          continue
-        
-        AAL += current_time - data.get_submitted_time()
-    
-    return AAL
+      self.__rerank()
 
+    # Wait till the end of the last time slot of the cycle
+    time.sleep(math.ceil(airtime) - airtime)
 
-  # Optimal MLRO schedule with bottom-up approach
-  def __request_optimal_schedule(self, Q):
-    current_time = time.time()
-    
-    S = []
-    # Find request that minimized AAL
-    while True:
-      # Equation 5
-      AAL = 0
-      lowest_latency_request = None
-      for request in Q:
-        latency = self.__request_average_access_latency(current_time, request["request"]["request_index"])
-
-        if AAL < latency:
-          AAL = latency
-          lowest_latency_request = request
-      
-      # No request was found
-      if not AAL:
-        break
-      
-      # Equation 6
-      S.append(lowest_latency_request)
-      Q.remove(lowest_latency_request)
 
-    return S
+  # Add the data items of the newly arrived requests that are not in V yet,
+  # as long as the unsent data items of V can be broadcast within delta
+  def __replan(self, arrivals):
+    scheduled = {data_item.get_index() for data_item in self.broadcast}
+    airtime = sum(self.scheduler.calculate_time(data_item.get_size()) for data_item in self.broadcast)
 
-
-  # Calculate the AAL of a request Q
-  def __request_average_access_latency(self, current_time, request_index):
-    AAL = current_time - self.pending[request_index].submitted_request_time
-
-    # Check for identical data items sets
-    for i in range(len(self.pending)):
-      if i == request_index:
+    for client in arrivals:
+      # The request finished in the meantime
+      if client.get_id() not in self.pending:
         continue
-      
-      # Identical data items
-      if self.pending[i] == self.pending[request_index].request:
-        AAL += current_time - self.pending[i].submitted_request_time
-    
-    return AAL
-
-
-  # Least Lost Heuristic Algorithm that returns an updated requests list Q
-  def __least_lost_heuristic(self, Q):
-    if not BENCHMARK:
-      print(Fore.RED + "Performing Least Loss Heuristic Algorithm" + Style.RESET_ALL)
-    
-
-    # W <- D(Q)
-    W = self.__populate_remainder_data_items(Q)
-
-    # Find item such that |Q| / t(d) is minimized
-    while self.__time_to_send_requests(Q) > self.delta:
-      minimized = sys.maxsize
-      minimized_data_item = None
-      for data in W:        
-        total_requests_containing_data_item = self.__total_requests_containing_data_item(Q, data['data_index'])
-        if minimized > total_requests_containing_data_item:
-          minimized = total_requests_containing_data_item
-          minimized_data_item = data
-        
-      
-      # This is NOT mentioned by the paper but helps to avoid starvation on large requests
-      if len(Q) < 2:
-        break
-      
-      # Delete d from W and delete Q that includes d
-      W.remove(minimized_data_item)
-      self.__remove_requests_conaining_data_item(Q, minimized_data_item)
-      
-    return Q
 
+      for data_item in client.get_outstanding():
+        if data_item.get_index() in scheduled:
+          continue
 
-  # Delete requests that contain a certain data item
-  def __remove_requests_conaining_data_item(self, Q, data_item):
-    for request in Q[:]:
-      for data in request["data"]:
-        if data != data_item:
+        download_time = self.scheduler.calculate_time(data_item.get_size())
+        if airtime + download_time > self.scheduler.delta:
           continue
-        Q.remove(request)
 
+        scheduled.add(data_item.get_index())
+        self.broadcast.append(data_item)
+        airtime += download_time
 
-  # Get request based on its index
-  def __get_request_by_index(self, Q, index):
-    for request in Q:
-      if request["request"]["request_index"] != index:
-        continue
-        
-      return request
-    return None
+    self.replans += 1
 
 
-  # Least lost heuristic: |{Q | Q ∈ Q, d ∈ D(Q)}|
-  def __total_requests_containing_data_item(self, Q, index):
-    total_requests = 0
+  # Reorder the unsent data items of V with the priority of the scheduler at the current time
+  def __rerank(self):
+    self.broadcast = self.scheduler.replan(list(self.pending.values()), self.broadcast, time.time())
 
-    for request in Q:
-      for data in request["data"]:
-        if data["data_index"] != index:
-          continue
-        total_requests += 1
 
-    return total_requests
-    
+  # Ask the scheduler for the data items of the cycle and populate the self.broadcast channel
+  def __scheduler(self):
+    if not self.broadcast:
+      if self.delta_controller is not None:
+        self.scheduler.delta = self.delta_controller.update(len(self.pending), self.last_scheduling_time)
+
+        if not self.scheduler.benchmark:
+          print("Cycle {}: delta {} for {} pending requests".format(self.cycles + 1, self.scheduler.delta, len(self.pending)))
+
+      # The schedulers address the pending requests by their position
+      pending = list(self.pending.values())
+
+      current_time = time.time()
+      start = timeit.default_timer()
+      data_items = self.scheduler.schedule(pending, current_time)
+      self.last_scheduling_time = timeit.default_timer() - start
+      self.scheduling_time += self.last_scheduling_time
+
+      if self.capture is not None:
+        self.capture.add(pending, current_time, self.scheduler.delta, data_items)
+      self.cycles += 1
+
+      # Put items into V, each data item once in the order of the scheduler
+      scheduled = set()
+      for data_item in data_items:
+        # Data item is already on air for another request
+        if data_item.get_index() in scheduled:
+          self.duplicate_data_items += 1
+          self.saved_airtime += self.__download_time(data_item.get_size())
+          continue
 
-  # Helper function to populate remainder data items W
-  def __populate_remainder_data_items(self, Q):
-    W = []
-    for request in Q:
-      for data in request["data"]:
-        W.append(data)
-    
-    return W
+        scheduled.add(data_item.get_index())
+        self.broadcast.append(data_item)
 
- 
-  # Perform the MTRS algorithm to optimize for throughput
-  def __mtrs(self):
-    if not BENCHMARK:
-      print(Fore.GREEN + "Performing the MTRS Algorithm" + Style.RESET_ALL)
 
-    model, status = self.__optimization_model()
-    
-    x, y = self.__preprocess_model_results(model)
-   
-    # n <- max(x_i)
-    n = -1
-    for request in x:
-      try:
-        if request["value"] > n:
-          n = request["value"]
-      except:
-          print("[ERROR] MTRS")
+  # Calculate the time to download a data item from the client side
+  def __download_time(self, size):
+    return size / (self.bandwidth * self.timeslots)
 
-    if n < 0:
-      return None
 
-    Q = []
-    # x_i = (x_i < n) ? 0 : 1
-    for request in x:
+  # A function that receives requests from connected clients.
+  # Only the events queued since the last call are processed.
+  # Returns the requests that were received and are pending
+  def __receive_requests(self):
+    # Finished requests are reported once their last data item is received. They are
+    # processed first because the client may have already sent its next request
+    while True:
       try:
-        if request["value"] < n:
-          request["value"] = 0
-        else:
-          request["value"] = 1
-          
-          D_Q = []
-          for data in y:
-            if data["request_index"] != request["request_index"]:
-              continue
-            
-            # Append only data items that are actually included in the result
-            data["value"] = 1
-            D_Q.append(data)
-
-          Q.append({"request": request, "data": D_Q})
-      except:
-          print("[ERROR] MTRS")
-
-
-    # y_j = (yj belongs to D_Q) ? 1 : 0
-    for data in y:
-      if self.__is_data_in_Q(Q, data["data_index"]):
-        data["value"] = 1
-      else:
-        data["value"] = 0
-      
-    return Q
-
+        client, latency, final = self.clients.completions.get_nowait()
+      except queue.Empty:
+        break
 
-  # Check if data item is included in the request
-  def __is_data_in_Q(self, Q, index):
-    for request in Q:
-      for data in request["data"]:
-        if data["data_index"] != index:
-          continue
-        return True
-    
-    return False
-    
+      if self.delta_controller is not None:
+        self.delta_controller.add_latency(latency)
+      self.__complete_request(client, final)
 
-  # Preprocess data to feed to PuLP for linear programming solution
-  def __preprocess_model_results(self, model):
-    # Get 
-    x = []
-    y = []
-    for variable in model.variables():
-      request_index = int(variable.name.split('_')[1]) - 1
+    received = []
+    while True:
       try:
-        if variable.name[0] == 'X':
-          item = {"name": variable.name, "value": variable.value(), "request_index": request_index}
-          x.append(item)
-        
-        elif variable.name[0] == 'Y':
-          data_index = int(variable.name.split('_')[2]) - 1
-
-          # Append only data items that are actually requested
-          data_item = self.pending[request_index].get_indexed_data_item(data_index)
-          if data_item != None:
-            item = {
-              "name": variable.name, 
-              "value": variable.value(), 
-              "request_index": request_index, 
-              "data_index": data_index, 
-              "time":  self.__calculate_time(data_item.get_size()),
-              "weight": 0
-            }
-
-            y.append(item)
+        client = self.clients.arrivals.get_nowait()
+      except queue.Empty:
+        break
       
-      except:
-        print("[ERROR] MTRS")
-    
-    return x, y
-
+      if self.__receive_request(client):
+        received.append(client)
 
-  # PuLP model for MTRS
-  def __optimization_model(self):
-    model = LpProblem("MTRS", LpMaximize)
+    return received
 
-    # Acquire decision variables for x and y 
-    data_decision_variables_x, data_decision_variables_y = self.__decision_data_definition()
-    
-    # Build the objective function
-    objective_function = lpSum(data_decision_variables_x)
-    model += objective_function
 
+  # Add a sent request to the pending list, returns whether the request is pending
+  def __receive_request(self, client):
+    # A request without data items is already served, it is the last request of the client
+    if not client.remaining:
+      self.__complete_request(client, True)
+      return False
 
-    # Add constraints
-    self.__constraints(model, data_decision_variables_x, data_decision_variables_y)
-    
-    # Solve the model and hide log message
-    model.solve(PULP_CBC_CMD(msg=False))
-
-    # Get model status
-    status =  LpStatus[model.status]
+    self.requested_data_items += client.remaining
 
-    return model, status
+    # Listen to the data items broadcast after the request arrived
+    client.downstream_position = len(self.downstream)
 
-
-  # Calculate time slots based on the size of the data item and throughput of the server
-  def __calculate_time(self, size):
-    return math.ceil(size / (self.bandwidth * self.timeslots))
-
-
-  # Add constraints to the model
-  def __constraints(self, model, data_decision_variables_x, data_decision_variables_y):
-    # Source for solving optimization problems using linear programming 
-    # with PuLP: https://towardsdatascience.com/linear-programming-using-python-priyansh-22b5ee888fe0
-
-    # List that pending requests are stored
-    # each row is a request with data items
-    pending_request_list = []
-    for client in self.pending:
-      
-      # Each data item for a request, zero if data item
-      # is not included on the pending request, else t(di) 
-      pending_data_list = []
-      
-      for i in range(self.data_items.item_count):
-        if not client.get_indexed_data_item(i):
-          pending_data_list.append(0)
-        else:
-          try:
-            # Calculate send data time for each item in the request 
-            time =  self.__calculate_time(client.get_indexed_data_item(i).get_size())
-            pending_data_list.append(time)
-          except:
-            pending_data_list.append(0)
-
-      # Append data to the request
-      pending_request_list.append(pending_data_list)
-
-    # Weights for each data item  
-    pending_request_matrix_y = np.array(pending_request_list)
+    self.pending[client.get_id()] = client
     
-    # Iterate over the pending requests to set: sum for all d_j of (t(d_j) * y_j) <= 1
-    for i in range(self.pending_requests_count):
-      model += lpSum(data_decision_variables_y[i] * pending_request_matrix_y[i]) <= 1
-      
-      # Iterate over the data items to set: x_i <= y_i with d_j belongs to D(Q_i)
-      for j in range(self.data_items.item_count):
-        model += lpSum(data_decision_variables_x[i] - data_decision_variables_y[i][j]) <= 0
+    client.received = True
+    return True
 
 
-  # Create decision variables for x,y to use in PuLP
-  def __decision_data_definition(self):
-    data_decision_variables_x = self.data_items.optimization_get_requests(self.pending_requests_count)
-    data_decision_variables_y = self.data_items.optimization_get_data_items(self.pending_requests_count)
-    
-    return data_decision_variables_x, data_decision_variables_y
+  # Remove a finished request from the pending list. The client is moved
+  # to the completed list when it does not send any more requests
+  def __complete_request(self, client, final=True):
+    if client.request_received():
+      del self.pending[client.get_id()]
+      client.received = False
 
+    if not final:
+      return
 
-  # A function that receives requests from connected clients
-  def __receive_requests(self, clients):
+    hits, misses = client.get_cache_statistics()
+    self.cache_hits += hits
+    self.cache_misses += misses
     
-    for i in range(len(clients)):
-      if clients[i].get_status() == RequestStatus.SENT and not clients[i].request_received():
-        self.pending.append(clients[i])
-        
-        clients[i].received = True
-
-        # Sort data items of the pending request based on their id.
-        # This is used later for latency computation.        
-        self.pending[-1].request.sort(key=lambda item: item.id)
-
-      elif clients[i].get_status() == RequestStatus.FINISHED:
-        self.clients.threads[i].join()
\ No newline at end of file
+    self.completed_count += 1
+    if self.records is not None:
+      self.records.add(client, self.scheduler.delta)
+    else:
+      self.completed.append(client)
+
+    # Wait for the client's thread to exit
+    self.clients.join_client(client)
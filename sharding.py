@@ -0,0 +1,140 @@
+import os
+import queue
+import timeit
+import threading
+import traceback
+import dataclasses
+import multiprocessing
+from schedulers import SCHEDULERS
+
+
+# Run a server for each shard of the data items in its own process. Every shard creates the
+# same clients with the same arrivals and only requests the data items of the shard. A request
+# finishes when all of its shards are finished, so its latency is the highest latency of the shards
+def run_sharded(config):
+  if config.long_running:
+    raise ValueError("Sharded mode keeps the latencies of all clients and does not support the long-running mode")
+
+  # Fail before any process is started
+  if config.scheduler not in SCHEDULERS:
+    raise ValueError("Unknown scheduler: {}, available schedulers: {}".format(config.scheduler, ", ".join(SCHEDULERS)))
+
+  context = multiprocessing.get_context("spawn")
+
+  # Shards start sending requests at the same time, after all of them are initialized
+  barrier = context.Barrier(config.shards)
+  results = context.Queue()
+
+  processes = []
+  for shard in range(config.shards):
+    shard_config = config
+    if config.capture:
+      shard_config = dataclasses.replace(config, capture=os.path.join(config.capture, "shard_{}".format(shard)))
+
+    process = context.Process(target=_run_shard, args=(shard_config, shard, barrier, results))
+    process.start()
+    processes.append(process)
+
+  # Read the results before joining, a process does not exit before its result is consumed.
+  # The remaining shards are stopped when a shard fails
+  try:
+    shards = _collect(processes, results)
+  except BaseException:
+    for process in processes:
+      process.terminate()
+    raise
+  finally:
+    for process in processes:
+      process.join()
+
+  return _combine(shards)
+
+
+# Wait for the result of every shard. A failed shard raises its error, a shard that only
+# failed because another one broke the barrier is reported when no other error arrives
+def _collect(processes, results):
+  shards = []
+  broken = None
+  while len(shards) + (broken is not None) < len(processes):
+    try:
+      result = results.get(timeout=1)
+    except queue.Empty:
+      for shard, process in enumerate(processes):
+        if process.exitcode not in (None, 0):
+          raise RuntimeError("Shard {} exited with code {}".format(shard, process.exitcode))
+      continue
+
+    if "error" not in result:
+      shards.append(result)
+    elif result["broken"]:
+      broken = broken or result
+    else:
+      raise RuntimeError("Shard {} failed:\n{}".format(result["shard"], result["error"]))
+
+  if broken is not None:
+    raise RuntimeError("Shard {} failed:\n{}".format(broken["shard"], broken["error"]))
+
+  return sorted(shards, key=lambda shard: shard["shard"])
+
+
+# Combine the latencies of the shards into the latency of each request
+def _combine(shards):
+  latencies = {}
+  for shard in shards:
+    for client_id, client_latencies in shard.pop("latencies").items():
+      combined = latencies.setdefault(client_id, [0] * len(client_latencies))
+      for round_index, latency in enumerate(client_latencies):
+        combined[round_index] = max(combined[round_index], latency)
+
+  AAL = 0
+  if latencies:
+    AAL = sum(sum(rounds) / len(rounds) for rounds in latencies.values() if rounds) / len(latencies)
+
+  # The shards run at the same time
+  execution_time = max(shard["execution_time"] for shard in shards)
+
+  return {
+    "AAL": AAL,
+    "execution_time": execution_time,
+    "throughput": len(latencies) / execution_time,
+    "shards": shards,
+  }
+
+
+# Simulate a single shard and put its results in the queue. On failure the barrier is
+# broken so the other shards do not wait for this one and the error is put in the queue
+def _run_shard(config, shard, barrier, results):
+  try:
+    _simulate_shard(config, shard, barrier, results)
+  except BaseException as error:
+    barrier.abort()
+    results.put({
+      "shard": shard,
+      "error": "".join(traceback.format_exception(type(error), error, error.__traceback__)),
+      "broken": isinstance(error, threading.BrokenBarrierError),
+    })
+
+
+def _simulate_shard(config, shard, barrier, results):
+  from main import init
+
+  clients, server, benchmark_info = init(config, (shard, config.shards))
+  barrier.wait()
+
+  start = timeit.default_timer()
+  clients.send_requests()
+  server.send_response()
+  stop = timeit.default_timer()
+
+  if server.capture is not None:
+    server.capture.close()
+
+  results.put({
+    "shard": shard,
+    "latencies": {client.get_id(): client.get_latencies() for client in clients.get_total_clients()},
+    "AAL": benchmark_info.get_total_AAL(),
+    "execution_time": stop - start,
+    "cycles": benchmark_info.get_cycles(),
+    "solve_time": benchmark_info.get_solve_time(),
+    "requested_data_items": benchmark_info.get_requested_data_items(),
+  })
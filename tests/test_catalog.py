@@ -0,0 +1,22 @@
+import catalog
+from utilities import DataItems
+
+
+def test_catalog_reproduces_the_generated_data_items(tmp_path, monkeypatch):
+  # Several chunks, the last one is shorter
+  monkeypatch.setattr(catalog, "CHUNK_SIZE", 700)
+  catalog.write_catalog(str(tmp_path), 2000, 0.8, 10, 30, 100)
+
+  generated = DataItems(2000, 0.8, 10, 30, 100)
+  mapped = DataItems(catalog=str(tmp_path))
+
+  assert mapped.item_count == generated.item_count
+  for index in range(2000):
+    assert mapped.get_size(index) == generated.get_size(index)
+    assert mapped.get_probability(index) == generated.get_probability(index)
+    assert mapped.get_data_item(index).get_id() == generated.get_data_item(index).get_id()
+
+  generated_order, generated_cumulative = generated.get_selection_table()
+  mapped_order, mapped_cumulative = mapped.get_selection_table()
+  assert list(mapped_order) == list(generated_order)
+  assert [float(value) for value in mapped_cumulative] == list(generated_cumulative)
@@ -0,0 +1,110 @@
+import copy
+import queue
+import threading
+from clients import Clients
+from server import Server
+from utilities import DataItems, LRUCache
+
+
+def test_least_recently_used_data_item_is_evicted():
+  cache = LRUCache(2)
+  cache.put(1, "d1")
+  cache.put(2, "d2")
+
+  # Data item 1 becomes the most recently used
+  assert cache.get(1) == "d1"
+  cache.put(3, "d3")
+
+  assert list(cache.data_items) == [1, 3]
+  assert cache.get(2) is None
+
+
+def test_hits_and_misses_are_counted():
+  cache = LRUCache(2)
+  cache.put(1, "d1")
+
+  cache.get(1)
+  cache.get(1)
+  cache.get(2)
+
+  assert (cache.hits, cache.misses) == (2, 1)
+
+
+# Run a client in a thread, the test plays the part of the server
+def start_client(requests, cache_size):
+  data_items = DataItems(10)
+  rounds = [[copy.copy(data_items.get_data_item(index)) for index in request] for request in requests]
+
+  downstream = []
+  arrivals = queue.Queue()
+  completions = queue.Queue()
+  client = Clients.Client(0, rounds[0], downstream, 0, arrivals, completions, rounds=rounds[1:], cache_size=cache_size)
+
+  thread = threading.Thread(target=client.send_request)
+  thread.start()
+
+  return client, thread, downstream, arrivals, completions, data_items
+
+
+# Broadcast data items to the client and wait till it processed them
+def broadcast(client, downstream, data_items, indices):
+  downstream.extend(data_items.get_data_item(index) for index in indices)
+  client.semaphore.release()
+  client.acknowledge.acquire()
+
+
+def test_fully_cached_rounds_do_not_wait_for_the_server():
+  # The second round is fully cached and not the last one, the
+  # last round is fully cached and only notifies the server
+  client, thread, downstream, arrivals, completions, data_items = start_client([[1, 2], [1], [2]], 4)
+
+  assert arrivals.get(timeout=5) is client
+  broadcast(client, downstream, data_items, [1, 2])
+
+  finished, latency, final = completions.get(timeout=5)
+  assert finished is client and not final
+
+  assert arrivals.get(timeout=5) is client
+  assert client.remaining == 0
+
+  thread.join(timeout=5)
+  assert not thread.is_alive()
+  assert completions.empty() and arrivals.empty()
+  assert len(client.get_latencies()) == 3
+  assert client.get_cache_statistics() == (2, 2)
+  assert client.get_data_item_count() == 4
+
+
+def test_last_round_requests_only_the_data_items_that_are_not_cached():
+  client, thread, downstream, arrivals, completions, data_items = start_client([[1], [1, 2]], 4)
+
+  assert arrivals.get(timeout=5) is client
+  broadcast(client, downstream, data_items, [1])
+  assert completions.get(timeout=5)[2] is False
+
+  assert arrivals.get(timeout=5) is client
+  assert list(client.outstanding) == [2]
+  broadcast(client, downstream, data_items, [2])
+
+  finished, latency, final = completions.get(timeout=5)
+  assert finished is client and final
+
+  thread.join(timeout=5)
+  assert client.get_cache_statistics() == (1, 2)
+
+
+def test_server_finishes_clients_after_their_last_round():
+  data_items = DataItems(10)
+  downstream = []
+  clients = Clients(3, data_items, downstream, 1, 3, 10, 0, request_rounds=3, cache_size=5)
+  server = Server(clients, data_items, downstream, 1024 * 1024, 1, 100, benchmark=True, scheduler="fcfs")
+
+  clients.send_requests()
+  server.send_response()
+
+  assert server.completed_count == 3
+  assert not server.pending
+  assert all(len(client.get_latencies()) == 3 for client in server.completed)
+
+  hits = sum(client.get_cache_statistics()[0] for client in server.completed)
+  assert server.cache_hits == hits
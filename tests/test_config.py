@@ -0,0 +1,37 @@
+import pytest
+from config import Config, CLIENTS, DELTA
+
+
+def test_defaults_are_used_without_overrides():
+  config = Config.from_args([], {})
+
+  assert config.clients == CLIENTS
+  assert config.delta == DELTA
+  assert 1 <= config.time_slot <= 3
+
+
+def test_environment_overrides_defaults():
+  config = Config.from_args([], {"MPC_CLIENTS": "500", "MPC_LONG_RUNNING": "yes"})
+
+  assert config.clients == 500
+  assert config.long_running is True
+
+
+def test_command_line_overrides_environment():
+  config = Config.from_args(["--clients", "20", "--long-running", "off"], {"MPC_CLIENTS": "500", "MPC_LONG_RUNNING": "true"})
+
+  assert config.clients == 20
+  assert config.long_running is False
+
+
+def test_values_are_converted_to_the_field_type():
+  config = Config.from_args(["--theta", "0.5", "--time-slot", "2"], {"MPC_SCHEDULER": "rxw"})
+
+  assert config.theta == 0.5
+  assert config.time_slot == 2
+  assert config.scheduler == "rxw"
+
+
+def test_invalid_boolean_is_rejected():
+  with pytest.raises(ValueError):
+    Config.from_args([], {"MPC_DEBUG": "maybe"})
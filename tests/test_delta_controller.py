@@ -0,0 +1,80 @@
+from clients import Clients
+from schedulers import DeltaController
+from server import Server
+from utilities import DataItems
+
+
+def test_initial_delta_is_clamped():
+  assert DeltaController(20, 2, 16).delta == 16
+  assert DeltaController(1, 2, 16).delta == 2
+
+
+def test_grows_when_pending_requests_grow():
+  controller = DeltaController(4, 2, 16)
+
+  assert controller.update(10, 0) == 5
+  assert controller.update(20, 0) == 6
+
+
+def test_shrinks_when_latency_rises_without_growing_backlog():
+  controller = DeltaController(4, 2, 16)
+  controller.update(10, 0)
+
+  controller.add_latency(1)
+  controller.update(10, 0)
+  controller.add_latency(3)
+
+  assert controller.update(10, 0) == 4
+
+
+def test_keeps_delta_when_nothing_changes():
+  controller = DeltaController(4, 2, 16)
+  controller.add_latency(1)
+  controller.update(0, 0)
+
+  assert controller.update(0, 0) == 4
+
+
+def test_grows_when_scheduling_takes_a_large_share_of_the_cycle():
+  controller = DeltaController(4, 2, 16, solver_share=0.25)
+
+  assert controller.update(0, 0.5) == 4
+  assert controller.update(0, 2) == 5
+
+
+def test_delta_stays_within_bounds():
+  controller = DeltaController(15, 2, 16)
+  for pending_count in range(1, 10):
+    controller.update(pending_count, 100)
+  assert controller.delta == 16
+
+  controller = DeltaController(3, 2, 16)
+  controller.update(5, 0)
+  for latency in range(1, 10):
+    controller.add_latency(latency)
+    controller.update(5, 0)
+  assert controller.delta == 2
+
+
+def test_reports_average_lowest_and_highest_delta():
+  controller = DeltaController(4, 2, 16)
+  controller.update(1, 0)
+  controller.update(2, 0)
+
+  assert controller.get_average_delta() == 5.5
+  assert (controller.lowest_delta, controller.highest_delta) == (4, 6)
+
+
+def test_online_replans_do_not_update_the_controller():
+  data_items = DataItems(10)
+  downstream = []
+  clients = Clients(10, data_items, downstream, 1, 4, 0, 1)
+  controller = DeltaController(8, 2, 16)
+
+  # Data items take about a second each, so requests arrive during the cycles
+  server = Server(clients, data_items, downstream, 64, 1, 8, online=True, benchmark=True, scheduler="lwf", delta_controller=controller)
+  clients.send_requests()
+  server.send_response()
+
+  assert server.replans
+  assert controller.cycles == server.cycles
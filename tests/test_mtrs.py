@@ -0,0 +1,52 @@
+import random
+from capture import CapturedRequest
+from schedulers import MTRSScheduler
+from utilities import DataItems
+
+
+# Pending request for the data items with the given indices and sizes in bytes
+def request(submitted_time, data_items):
+  items = []
+  for index, size in data_items:
+    data_item = DataItems.DataItem(index, size, 0)
+    data_item.submitted_request_time = submitted_time
+    items.append(data_item)
+
+  return CapturedRequest(submitted_time, items)
+
+
+def test_shared_data_items_are_counted_once_against_delta():
+  # Three requests for the same four one-slot data items need four slots
+  pending = [request(time, [(index, 1024) for index in range(4)]) for time in (1.0, 2.0, 3.0)]
+  scheduler = MTRSScheduler(None, 1, 1, 4, benchmark=True)
+
+  V = scheduler.schedule(pending, 10.0)
+
+  assert len(V) == 12
+  assert {data_item.get_index() for data_item in V} == {0, 1, 2, 3}
+
+
+def test_pooled_components_give_the_same_schedule():
+  # Requests only share data items within their group, which gives six components
+  generator = random.Random(3)
+  sizes = [generator.randint(10 * 1024, 30 * 1024) for _ in range(60)]
+
+  pending = []
+  for request_index in range(120):
+    group = request_index % 6
+    indices = generator.sample(range(group * 10, group * 10 + 10), generator.randint(1, 4))
+    pending.append(request(generator.uniform(0, 5), [(index, sizes[index]) for index in indices]))
+
+  serial = MTRSScheduler(None, 1024, 1, 4, benchmark=True)
+  pooled = MTRSScheduler(None, 1024, 1, 4, benchmark=True, workers=2, parallel_threshold=5)
+  try:
+    expected = [data_item.get_index() for data_item in serial.schedule(pending, 10.0)]
+    scheduled = [data_item.get_index() for data_item in pooled.schedule(pending, 10.0)]
+
+    # The components were solved in the process pool
+    assert pooled.executor is not None
+  finally:
+    pooled.close()
+
+  assert serial.components == pooled.components == 6
+  assert scheduled and scheduled == expected
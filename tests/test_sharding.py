@@ -0,0 +1,14 @@
+import pytest
+from config import Config
+from sharding import run_sharded
+
+
+def test_unknown_scheduler_is_rejected_before_starting_shards():
+  with pytest.raises(ValueError):
+    run_sharded(Config(shards=2, scheduler="bogus"))
+
+
+def test_failed_shard_stops_the_run(tmp_path):
+  # The catalog does not exist, so every shard fails while it is initialized
+  with pytest.raises(RuntimeError, match="Shard"):
+    run_sharded(Config(shards=2, catalog=str(tmp_path / "missing"), benchmark=True))
@@ -0,0 +1,60 @@
+import time
+import timeit
+import threading
+import numpy as np
+from clients import Clients
+from utilities import DataItems
+from workload import Workload, generate_workload
+
+
+def generate(path, processes):
+  generate_workload(str(path), requests=250, item_count=50, minimum_data_items=1, maximum_data_items=5, seed=7, chunk_size=40, processes=processes)
+  return Workload(str(path))
+
+
+def test_workload_does_not_depend_on_the_number_of_processes(tmp_path):
+  serial = generate(tmp_path / "serial", 1)
+  parallel = generate(tmp_path / "parallel", 3)
+
+  assert np.array_equal(serial.offsets, parallel.offsets)
+  assert np.array_equal(serial.indices, parallel.indices)
+  assert np.array_equal(serial.arrivals, parallel.arrivals)
+  assert serial.metadata == parallel.metadata
+
+
+def test_requests_match_the_generation_settings(tmp_path):
+  workload = generate(tmp_path / "workload", 1)
+
+  assert len(workload) == 250
+  assert workload.get_item_count() == 50
+  for index in range(len(workload)):
+    request = workload.get_request(index)
+    assert 1 <= len(request) <= 5
+    assert request.min() >= 0 and request.max() < 50
+
+  assert np.all(np.diff(workload.arrivals) >= 0)
+
+
+def test_data_items_are_submitted_at_the_arrival_of_the_request(tmp_path):
+  generate_workload(str(tmp_path), requests=2, item_count=10, minimum_data_items=1, maximum_data_items=3, seed=7, arrival_rate=5)
+  workload = Workload(str(tmp_path))
+
+  data_items = DataItems(10)
+  downstream = []
+  clients = Clients(0, data_items, downstream, workload=workload)
+  client = clients.get_total_clients()[0]
+
+  wall_start = time.time()
+  thread = threading.Thread(target=client.send_request, args=(timeit.default_timer(),))
+  thread.start()
+
+  assert clients.arrivals.get(timeout=5) is client
+  submitted_times = [data_item.get_submitted_time() for data_item in client.get_request()]
+
+  # Broadcast the data items so the client finishes
+  downstream.extend(client.get_request())
+  client.semaphore.release()
+  client.acknowledge.acquire()
+  thread.join(timeout=5)
+
+  assert min(submitted_times) >= wall_start + workload.get_arrival(0) - 0.01
@@ -1,13 +1,13 @@
 import random
 from enum import Enum
-from pulp import *
-import numpy as np
+from itertools import accumulate
+from collections import OrderedDict
 import time
-from config import DEBUG, BENCHMARK
+# PuLP, NumPy and colorama are imported by the functions that use them
 
 
 class DataItems:
-  def __init__(self, item_count=1000, theta=0.8, minimum_size=10, maximum_size=30, seed=100):
+  def __init__(self, item_count=1000, theta=0.8, minimum_size=10, maximum_size=30, seed=100, catalog=None):
     # Zipf distribution related information
     self.item_count = item_count
     self.theta = theta
@@ -22,50 +22,67 @@ class DataItems:
     # List of data items to be initialized
     self.data_items = []
 
+    # Columns of a catalog file created by catalog.py. The data items are read from 
+    # the read-only memory maps instead of being generated, the parameters above are ignored
+    self.catalog = catalog
+    self.ids = None
+    self.sizes = None
+    self.probabilities = None
+    self.cumulative = None
+
     # Initialize the data items list
-    self.__init_data_items()
+    if catalog:
+      self.__load_catalog()
+    else:
+      self.__init_data_items()
 
 
-  # Return all available data items
+  # Return all available data items.
+  # A catalog is read into a list, this is only meant for small catalogs
   def get_data_items(self):
+    if self.catalog:
+      return [self.get_data_item(i) for i in range(self.item_count)]
+
     return self.data_items
 
 
   # Return data item located at index position
   def get_data_item(self, index):
-    if index < len(self.data_items):
-      return self.data_items[index]
+    if index >= self.item_count:
+      return None
+
+    if self.catalog:
+      return self.DataItem(int(self.ids[index]), int(self.sizes[index]), float(self.probabilities[index]))
     
-    return None
+    return self.data_items[index]
+
 
+  # Return the size of the data item located at index position
+  def get_size(self, index):
+    if self.catalog:
+      return int(self.sizes[index])
 
-  # Get requests for linear programming to solve the optimization 
-  # problem based on the number of requests given by the server
-  def optimization_get_requests(self, total_requests):
-    x = []
-    for i in range(1, total_requests + 1):
-      x.append(str(i))
+    return self.data_items[index].get_size()
 
-    # PuLP Variables for linear programming and optimizing solution
-    decision_variables = LpVariable.matrix("X", x, cat="Continuous", lowBound=0, upBound=1) # 0 <= x <= 1
-    decision_variables_allocation = np.array(decision_variables)
 
-    return decision_variables_allocation
+  # Return the probability of the data item located at index position
+  def get_probability(self, index):
+    if self.catalog:
+      return float(self.probabilities[index])
 
+    return self.data_items[index].get_probability()
 
-  # Get data items for linear programming to solve the optimization 
-  # problem based on the number of requests given by the server
-  def optimization_get_data_items(self, total_requests):
-    y = []
-    for i in range(1, total_requests + 1):
-      for j in range(1, self.item_count + 1):
-        y.append(str(i) + '_' + str(j))
 
-    # PuLP Variables for linear programming and optimizing solution
-    decision_variables = LpVariable.matrix("Y", y, cat="Continuous", lowBound=0, upBound=1) # 0 <= y <= 1
-    decision_variables_allocation = np.array(decision_variables).reshape(total_requests, self.item_count)
+  # Return the data item indices sorted by their selection probability and
+  # the accumulated probabilities in that order, used to select data items
+  def get_selection_table(self):
+    # The probabilities of a catalog are already in descending order,
+    # the mapped cumulative column is used without copying it
+    if self.catalog:
+      return range(self.item_count), self.cumulative
 
-    return decision_variables_allocation
+    order = sorted(range(self.item_count), key=lambda index: self.data_items[index].get_probability(), reverse=True)
+    return order, list(accumulate(self.data_items[index].get_probability() for index in order))
 
 
   # Initialize data items list with random data items
@@ -73,24 +90,38 @@ class DataItems:
     
     # Seed to generate pseudo-random sizes
     random.seed(self.seed)
+
+    # The Zipf denominator is the same for all data items
+    denominator = 0
+    for i in range(0, self.item_count):
+      denominator += (1 / (i + 1)) ** self.theta
     
     for i in range(self.item_count):
       size = random.randint(self.minimum_size, self.maximum_size)
-      probability = self.__zipf(self.item_count, self.theta, i)
+      probability = self.__zipf(self.theta, i, denominator)
       data_item = self.DataItem(i, size, probability)
 
       # Add a data item to the list of data items
       self.data_items.append(data_item)
 
 
+  # Open the columns of the catalog
+  def __load_catalog(self):
+    from catalog import load_catalog
+
+    metadata, self.ids, self.sizes, self.probabilities, self.cumulative = load_catalog(self.catalog)
+
+    self.item_count = len(self.ids)
+    self.theta = metadata["theta"]
+    self.minimum_size = metadata["minimum_size"] * 1024
+    self.maximum_size = metadata["maximum_size"] * 1024
+    self.seed = metadata["seed"]
+
+
   # Method that calculates the probability of a data item
   # being selected based on the Zipf distribution
-  def __zipf(self, items, theta, position):
+  def __zipf(self, theta, position, denominator):
     nominator = (1 / (position + 1)) ** theta
-    
-    denominator = 0
-    for i in range(0, items):
-      denominator += (1 / (i + 1)) ** theta
   
     return nominator / denominator
 
@@ -144,6 +175,13 @@ class DataItems:
       self.submitted_request_time = time.time()
 
 
+# Wrap text with a console color, e.g. colored("text", "GREEN")
+def colored(text, color):
+  from colorama import Fore, Style
+
+  return getattr(Fore, color) + text + Style.RESET_ALL
+
+
 # Helper Enum to check the status of the request
 class RequestStatus(Enum):
   WAITING = 0
@@ -151,13 +189,89 @@ class RequestStatus(Enum):
   FINISHED = 2
 
 
+# Bounded cache of data items with least recently used eviction
+class LRUCache:
+  def __init__(self, capacity):
+    self.capacity = capacity
+    self.data_items = OrderedDict() # Data item index -> data item, least recently used first
+    self.hits = 0
+    self.misses = 0
+
+
+  # Return a cached data item and mark it as recently used
+  def get(self, index):
+    data_item = self.data_items.get(index)
+    if data_item is None:
+      self.misses += 1
+      return None
+
+    self.data_items.move_to_end(index)
+    self.hits += 1
+    return data_item
+
+
+  # Add a data item, the least recently used data item is evicted when the cache is full
+  def put(self, index, data_item):
+    self.data_items[index] = data_item
+    self.data_items.move_to_end(index)
+
+    if len(self.data_items) > self.capacity:
+      self.data_items.popitem(last=False)
+
+
+# Compact records of finished requests used by the long-running mode. Each record
+# (id, latency, data items, delta of the cycle it finished in) is written to a CSV file when a path is given
+class CompletionRecords:
+  def __init__(self, path=None):
+    self.count = 0
+    self.total_latency = 0
+    self.total_data_items = 0
+
+    self.file = None
+    if path:
+      self.file = open(path, 'w')
+      self.file.write("id,latency,data_items,delta\n")
+
+
+  # Summarize a finished client, the client is not referenced afterwards
+  def add(self, client, delta):
+    data_items = client.get_data_item_count()
+
+    self.count += 1
+    self.total_latency += client.get_latency()
+    self.total_data_items += data_items
+
+    if self.file:
+      self.file.write("{},{},{},{}\n".format(client.get_id(), client.get_latency(), data_items, delta))
+
+
+  # Return the AAL of the recorded requests
+  def get_AAL(self):
+    if not self.count:
+      return 0
+
+    return self.total_latency / self.count
+
+
+  # Flush and close the records file
+  def close(self):
+    if self.file:
+      self.file.close()
+      self.file = None
+
+
 # Class used for benchmarking operations
 # Feature must be added to handle .xlsx files
 class BenchmarkUtilities:
   def __init__(self, clients, server):
     self.clients = clients
+    self.server = server
 
   def get_total_AAL(self):
+    # Long-running mode does not keep the finished clients
+    if self.server.records is not None:
+      return self.server.records.get_AAL()
+
     AAL = 0
     for client in self.clients.get_total_clients():
       AAL += client.get_latency()
@@ -165,3 +279,69 @@ class BenchmarkUtilities:
     AAL /= len(self.clients.get_total_clients())
     
     return AAL
+
+
+  # Return the download time in timeslots that was saved by broadcasting shared data items once
+  def get_saved_airtime(self):
+    return self.server.saved_airtime
+
+
+  # Return the number of duplicate data items that were not broadcast
+  def get_duplicate_data_items(self):
+    return self.server.duplicate_data_items
+
+
+  # Return the number of times the online mode re-planned a broadcast
+  def get_replans(self):
+    return self.server.replans
+
+
+  # Return the number of finished requests per second
+  def get_throughput(self, execution_time):
+    return self.server.completed_count / execution_time
+
+
+  # Return the number of broadcast cycles
+  def get_cycles(self):
+    return self.server.cycles
+
+
+  # Return the average time the scheduler needed for a cycle
+  def get_average_scheduling_time(self):
+    if not self.server.cycles:
+      return 0
+
+    return self.server.scheduling_time / self.server.cycles
+
+
+  # Return the number of MTRS components that were solved
+  def get_components(self):
+    return self.server.scheduler.components
+
+
+  # Return the time the scheduler spent in the optimization solver
+  def get_solve_time(self):
+    return self.server.scheduler.solve_time
+
+
+  # Return the average, lowest and highest delta of the cycles
+  def get_delta(self):
+    controller = self.server.delta_controller
+    if controller is None:
+      return self.server.scheduler.delta, self.server.scheduler.delta, self.server.scheduler.delta
+
+    return controller.get_average_delta(), controller.lowest_delta, controller.highest_delta
+
+
+  # Return the share of requested data items that were found in the clients' caches
+  def get_cache_hit_rate(self):
+    lookups = self.server.cache_hits + self.server.cache_misses
+    if not lookups:
+      return 0
+
+    return self.server.cache_hits / lookups
+
+
+  # Return the number of data items the clients requested from the server
+  def get_requested_data_items(self):
+    return self.server.requested_data_items
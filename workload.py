@@ -0,0 +1,152 @@
+import os
+import json
+import argparse
+from multiprocessing import Pool
+from config import TOTAL_DATA_ITEMS, THETA, CLIENTS, MIN_DATA_ITEMS, MAX_DATA_ITEMS, CLIENT_SEED
+# NumPy is imported by the functions that use it
+
+# Files of a workload directory. Request i has the data item indices
+# indices[offsets[i]:offsets[i + 1]] and arrives arrivals[i] seconds after the start
+OFFSETS_FILE = "offsets.npy"
+INDICES_FILE = "indices.npy"
+ARRIVALS_FILE = "arrivals.npy"
+METADATA_FILE = "workload.json"
+
+# Default generation settings
+ARRIVAL_RATE = 100 # Requests per second
+CHUNK_SIZE = 100000 # Requests generated by a single task
+
+
+# Workload read from a directory created by generate_workload.
+# The arrays are memory-mapped read-only so requests are read without copying
+class Workload:
+  def __init__(self, path):
+    import numpy as np
+
+    with open(os.path.join(path, METADATA_FILE)) as metadata:
+      self.metadata = json.load(metadata)
+
+    self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r')
+    self.indices = np.load(os.path.join(path, INDICES_FILE), mmap_mode='r')
+    self.arrivals = np.load(os.path.join(path, ARRIVALS_FILE), mmap_mode='r')
+
+
+  def __len__(self):
+    return len(self.arrivals)
+
+
+  # Return the data item indices of a request as a view of the mapped file
+  def get_request(self, index):
+    return self.indices[self.offsets[index]:self.offsets[index + 1]]
+
+
+  # Return the arrival time of a request in seconds after the start of the simulation
+  def get_arrival(self, index):
+    return float(self.arrivals[index])
+
+
+  # Return the number of data items the workload was generated for
+  def get_item_count(self):
+    return self.metadata["item_count"]
+
+
+# Cumulative Zipf probabilities of the data items, same distribution as DataItems
+def zipf_cumulative_probabilities(item_count, theta):
+  import numpy as np
+
+  weights = (1 / np.arange(1, item_count + 1, dtype=np.float64)) ** theta
+  return np.cumsum(weights / weights.sum())
+
+
+# Generate a workload of requests for the Zipf distribution of the data items.
+# Request sizes and arrivals are generated first, then the data item indices
+# are generated in chunks that can run in parallel processes. The result only
+# depends on the seed and the chunk size, not on the number of processes
+def generate_workload(path, requests=CLIENTS, item_count=TOTAL_DATA_ITEMS, theta=THETA, minimum_data_items=MIN_DATA_ITEMS,
+                      maximum_data_items=MAX_DATA_ITEMS, seed=CLIENT_SEED, arrival_rate=ARRIVAL_RATE, chunk_size=CHUNK_SIZE, processes=1):
+  import numpy as np
+
+  os.makedirs(path, exist_ok=True)
+  chunks = range(0, requests, chunk_size)
+
+  offsets = np.lib.format.open_memmap(os.path.join(path, OFFSETS_FILE), mode='w+', dtype=np.int64, shape=(requests + 1,))
+  arrivals = np.lib.format.open_memmap(os.path.join(path, ARRIVALS_FILE), mode='w+', dtype=np.float64, shape=(requests,))
+
+  # Number of data items and arrival of each request
+  offsets[0] = 0
+  last_arrival = 0
+  for chunk, start in enumerate(chunks):
+    end = min(start + chunk_size, requests)
+    generator = np.random.default_rng([seed, chunk, 0])
+
+    counts = generator.integers(minimum_data_items, maximum_data_items + 1, end - start)
+    offsets[start + 1:end + 1] = offsets[start] + np.cumsum(counts)
+
+    # Poisson arrivals with the given rate
+    arrivals[start:end] = last_arrival + np.cumsum(generator.exponential(1 / arrival_rate, end - start))
+    last_arrival = arrivals[end - 1]
+
+  total_data_items = int(offsets[requests])
+  offsets.flush()
+  arrivals.flush()
+  del offsets, arrivals
+
+  # Smallest integer type that can hold a data item index
+  index_type = np.int32 if item_count <= np.iinfo(np.int32).max else np.int64
+  indices = np.lib.format.open_memmap(os.path.join(path, INDICES_FILE), mode='w+', dtype=index_type, shape=(total_data_items,))
+  del indices
+
+  tasks = [(path, chunk, start, min(start + chunk_size, requests), item_count, theta, seed) for chunk, start in enumerate(chunks)]
+  if processes > 1:
+    with Pool(processes) as pool:
+      pool.starmap(_generate_chunk, tasks)
+  else:
+    for task in tasks:
+      _generate_chunk(*task)
+
+  with open(os.path.join(path, METADATA_FILE), 'w') as metadata:
+    json.dump({
+      "requests": requests,
+      "data_items": total_data_items,
+      "item_count": item_count,
+      "theta": theta,
+      "seed": seed,
+      "arrival_rate": arrival_rate,
+      "chunk_size": chunk_size,
+    }, metadata, indent=2)
+
+
+# Generate the data item indices of the requests [start, end) in place
+def _generate_chunk(path, chunk, start, end, item_count, theta, seed):
+  import numpy as np
+
+  offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r')
+  indices = np.load(os.path.join(path, INDICES_FILE), mmap_mode='r+')
+
+  first, last = offsets[start], offsets[end]
+  generator = np.random.default_rng([seed, chunk, 1])
+
+  # Select data items based on their probability, rounding errors at the end are mapped to the last data item
+  cumulative_probabilities = zipf_cumulative_probabilities(item_count, theta)
+  selected = np.searchsorted(cumulative_probabilities, generator.random(last - first), side='right')
+  indices[first:last] = np.minimum(selected, item_count - 1)
+
+  indices.flush()
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Generate a memory-mapped workload of requests")
+  parser.add_argument("path", help="Output directory")
+  parser.add_argument("--requests", type=int, default=CLIENTS)
+  parser.add_argument("--total-data-items", type=int, default=TOTAL_DATA_ITEMS)
+  parser.add_argument("--theta", type=float, default=THETA)
+  parser.add_argument("--min-data-items", type=int, default=MIN_DATA_ITEMS)
+  parser.add_argument("--max-data-items", type=int, default=MAX_DATA_ITEMS)
+  parser.add_argument("--seed", type=int, default=CLIENT_SEED)
+  parser.add_argument("--arrival-rate", type=float, default=ARRIVAL_RATE)
+  parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+  parser.add_argument("--processes", type=int, default=1)
+  arguments = parser.parse_args()
+
+  generate_workload(arguments.path, arguments.requests, arguments.total_data_items, arguments.theta, arguments.min_data_items,
+                    arguments.max_data_items, arguments.seed, arguments.arrival_rate, arguments.chunk_size, arguments.processes)